@@ -0,0 +1,230 @@
+import threading
+import urllib.parse
+import requests
+from api_client import api_client
+from browser_pool import browser_pool
+from session_manager import session_manager
+from utils import parse_assignment_status
+from config import Config
+
+
+# Raised before anything reached the server: safe to try another executor
+PRE_SEND_ERRORS = (
+    requests.exceptions.ConnectTimeout,
+    requests.exceptions.InvalidURL,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidSchema
+)
+
+
+def render_template(template, **fields):
+    """Format every string in a (nested) JSON template with fields"""
+    if isinstance(template, str):
+        return template.format(**fields)
+    if isinstance(template, dict):
+        return {key: render_template(value, **fields) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render_template(value, **fields) for value in template]
+    return template
+
+
+def is_login_redirect(location: str) -> bool:
+    """Redirect target is the SSO / login page"""
+    location = location or ''
+    return 'sso.bps.go.id' in location or 'login' in location.lower()
+
+
+def fetch_current_status(assignment_id: str) -> str:
+    """Latest status of an assignment from its history"""
+    status_list = parse_assignment_status(api_client.get_assignment_history(assignment_id))
+    return status_list[-1]['status_assignment'] if status_list else 'Open'
+
+
+class SeleniumActionExecutor:
+    """
+    Performs actions by clicking the review page buttons in the browser.
+    Headless pool workers are started on the first click, so a run where
+    another executor handles everything never launches them.
+    """
+    
+    name = 'selenium'
+    
+    BUTTON_MAP = {
+        'approve': 'buttonApprove',
+        'revoke': 'buttonRevoke',
+        'reject': 'buttonReject'
+    }
+    
+    def __init__(self, on_pool_start=None):
+        self.on_pool_start = on_pool_start
+        self._pool_lock = threading.Lock()
+        self._pool_started = False
+    
+    @property
+    def concurrency(self) -> int:
+        return max(1, Config.BROWSER_POOL_SIZE)
+    
+    def is_available(self, action_type: str) -> bool:
+        return action_type in self.BUTTON_MAP
+    
+    def _start_pool(self):
+        with self._pool_lock:
+            if self._pool_started:
+                return
+            self._pool_started = True
+            if Config.BROWSER_POOL_SIZE > 1:
+                workers = browser_pool.start()
+                if self.on_pool_start:
+                    self.on_pool_start(workers)
+    
+    def execute(self, action_type: str, assignment_id: str, review_url: str, period_id: str, template_id: str,
+                status: str = None) -> dict:
+        self._start_pool()
+        button_id = self.BUTTON_MAP.get(action_type, 'buttonApprove')
+        return browser_pool.navigate_and_click(review_url, button_id)
+
+
+class HttpActionExecutor:
+    """
+    Sends the state transition straight to the FASIH assignment API using
+    the logged-in session cookies and XSRF header (no page load).
+    Success needs a JSON body with success=true. A failed result carries
+    uncertain=True when the request may have been applied anyway (timeout
+    after sending, 5xx, unexpected redirect, unconfirmed 2xx) and
+    session_expired=True on 401/403 or a redirect to the login page.
+    """
+    
+    name = 'http'
+    
+    def __init__(self, endpoints: dict = None, payload: dict = None):
+        self.endpoints = endpoints if endpoints is not None else Config.ACTION_API_ENDPOINTS
+        self.payload = payload if payload is not None else Config.ACTION_API_PAYLOAD
+    
+    @property
+    def concurrency(self) -> int:
+        return max(1, Config.ACTION_HTTP_WORKERS)
+    
+    def is_available(self, action_type: str) -> bool:
+        return bool(self.endpoints.get(action_type)) and session_manager.get_session() is not None
+    
+    def execute(self, action_type: str, assignment_id: str, review_url: str, period_id: str, template_id: str,
+                status: str = None) -> dict:
+        session = session_manager.get_session()
+        if not session:
+            return {'success': False, 'message': 'Not logged in'}
+        
+        fields = {
+            'base': Config.ASSIGNMENT_API,
+            'assignment_id': assignment_id,
+            'period_id': period_id,
+            'template_id': template_id
+        }
+        url = self.endpoints[action_type].format(**fields)
+        payload = render_template(self.payload, **fields)
+        
+        # XSRF token may have rotated since login, always send the current cookie value
+        xsrf_token = urllib.parse.unquote(session.cookies.get('XSRF-TOKEN', '') or '')
+        headers = {'X-XSRF-TOKEN': xsrf_token} if xsrf_token else {}
+        
+        try:
+            # A redirect means the session did not reach the endpoint (e.g. expired -> SSO)
+            resp = session.post(url, json=payload, headers=headers, allow_redirects=False)
+        except PRE_SEND_ERRORS as e:
+            return {'success': False, 'message': str(e)}
+        except Exception as e:
+            return {'success': False, 'message': str(e), 'uncertain': True}
+        
+        code = resp.status_code
+        if code in (401, 403) or (300 <= code < 400 and is_login_redirect(resp.headers.get('Location'))):
+            return {'success': False, 'message': f'Session expired (HTTP {code} from {action_type} endpoint)', 'session_expired': True}
+        if 300 <= code < 400:
+            return {'success': False, 'message': f'HTTP {code} redirect from {action_type} endpoint', 'uncertain': True}
+        if code >= 500:
+            return {'success': False, 'message': f'HTTP {code} from {action_type} endpoint', 'uncertain': True}
+        if code >= 400:
+            return {'success': False, 'message': f'HTTP {code} from {action_type} endpoint'}
+        
+        try:
+            body = resp.json()
+        except ValueError:
+            body = None
+        
+        if isinstance(body, dict) and body.get('success') is False:
+            return {'success': False, 'message': body.get('message') or f'{action_type} rejected by server'}
+        if not isinstance(body, dict) or body.get('success') is not True:
+            # 2xx without a JSON confirmation (HTML login page, empty body): cannot tell
+            return {'success': False, 'message': f'Unconfirmed response (HTTP {code}) from {action_type} endpoint', 'uncertain': True}
+        
+        return {'success': True, 'message': f'{action_type} sent via API'}
+
+
+class FallbackActionExecutor:
+    """
+    Tries each executor in order, falling back to the next one on a definite
+    failure. After an uncertain failure the assignment status is re-checked
+    first: changed means the action went through, unchanged means it is safe
+    to retry; without a known pre-action status there is no fallback.
+    """
+    
+    def __init__(self, executors: list, status_lookup=fetch_current_status):
+        self.executors = executors
+        self.status_lookup = status_lookup
+    
+    @property
+    def name(self) -> str:
+        return '+'.join(e.name for e in self.executors)
+    
+    @property
+    def concurrency(self) -> int:
+        """Actions in flight at once: set by the primary executor, fallbacks queue behind it"""
+        return self.executors[0].concurrency
+    
+    def is_available(self, action_type: str) -> bool:
+        return any(e.is_available(action_type) for e in self.executors)
+    
+    def execute(self, action_type: str, assignment_id: str, review_url: str, period_id: str, template_id: str,
+                status: str = None) -> dict:
+        result = {'success': False, 'message': f'No executor available for {action_type}'}
+        for executor in self.executors:
+            if not executor.is_available(action_type):
+                continue
+            result = executor.execute(action_type, assignment_id, review_url, period_id, template_id, status)
+            result['executor'] = executor.name
+            if result['success']:
+                return result
+            if result.get('uncertain'):
+                applied = self._applied(assignment_id, status)
+                if applied is None:
+                    result['message'] += ' (outcome unknown, not retried)'
+                    return result
+                if applied:
+                    return {
+                        'success': True,
+                        'message': f'{action_type} applied (status changed after: {result["message"]})',
+                        'executor': executor.name
+                    }
+        return result
+    
+    def _applied(self, assignment_id: str, status: str) -> bool:
+        """Whether the status moved away from the pre-action status, or None if unknown"""
+        if status is None:
+            return None
+        try:
+            return self.status_lookup(assignment_id) != status
+        except Exception:
+            return None
+
+
+def get_action_executor(mode: str = None, on_pool_start=None):
+    """
+    Build action executor for a mode: 'http', 'selenium' or 'auto'
+    (HTTP first, Selenium click path as fallback).
+    on_pool_start(workers) is called if browser pool workers get started.
+    """
+    mode = (mode or Config.ACTION_EXECUTOR or 'auto').lower()
+    
+    if mode == 'http':
+        return FallbackActionExecutor([HttpActionExecutor()])
+    if mode == 'selenium':
+        return FallbackActionExecutor([SeleniumActionExecutor(on_pool_start)])
+    return FallbackActionExecutor([HttpActionExecutor(), SeleniumActionExecutor(on_pool_start)])
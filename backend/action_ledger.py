@@ -0,0 +1,99 @@
+from datetime import datetime
+from config import Config
+from sqlite_store import SQLiteStore
+
+
+# Columns of an action log row, in log file order
+LEDGER_COLUMNS = ['assignment_id', 'smallcode', 'status', 'action', 'result', 'message', 'executor']
+
+# Who acted and at which history state; added after the first ledger version
+SCOPE_COLUMNS = ['role', 'username', 'marker']
+
+
+class ActionLedger(SQLiteStore):
+    """
+    Append-only record of approve/revoke/reject outcomes, one row per
+    assignment per run (run_id = task id). Rows are written as they happen,
+    so a crashed run keeps everything done so far. Each row also keeps the
+    role and user that acted and the assignment's history marker, so a rerun
+    can tell its own earlier successes from other approval levels.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS action_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            period_id TEXT NOT NULL,
+            assignment_id TEXT NOT NULL,
+            smallcode TEXT,
+            status TEXT,
+            action TEXT NOT NULL,
+            result TEXT NOT NULL,
+            message TEXT,
+            executor TEXT,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ledger_run ON action_ledger (run_id);
+        CREATE INDEX IF NOT EXISTS idx_ledger_success ON action_ledger (period_id, result, assignment_id);
+    """
+    SYNCHRONOUS = 'NORMAL'
+
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path or Config.ACTION_LEDGER_PATH)
+
+    def _migrate(self, conn):
+        existing = {row['name'] for row in conn.execute('PRAGMA table_info(action_ledger)')}
+        for column in SCOPE_COLUMNS:
+            if column not in existing:
+                conn.execute(f'ALTER TABLE action_ledger ADD COLUMN {column} TEXT')
+
+    def record(self, run_id: str, period_id: str, entry: dict):
+        """Append one log entry (keys as LEDGER_COLUMNS, optionally SCOPE_COLUMNS)"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                'INSERT INTO action_ledger '
+                '(run_id, period_id, assignment_id, smallcode, status, action, result, message, executor, '
+                'role, username, marker, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run_id, period_id, entry['assignment_id'], entry.get('smallcode'), entry.get('status'),
+                 entry['action'], entry['result'], entry.get('message'), entry.get('executor'),
+                 entry.get('role'), entry.get('username'), entry.get('marker'),
+                 datetime.now().isoformat())
+            )
+
+    def succeeded(self, period_id: str, action_type: str, role: str, username: str) -> dict:
+        """
+        {assignment_id: (pre-action status, history marker)} for assignments whose
+        latest successful action in this period is action_type by this role and user.
+        An approve followed by a successful revoke, or by another level's approve,
+        no longer counts. Rows written without role/user/marker never match.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT assignment_id, action, status, role, username, marker FROM action_ledger '
+            'WHERE period_id = ? AND result = ? ORDER BY id',
+            (period_id, 'success')
+        ).fetchall()
+
+        latest = {}
+        for row in rows:
+            latest[row['assignment_id']] = row
+        return {
+            assignment_id: (row['status'], row['marker'])
+            for assignment_id, row in latest.items()
+            if row['action'] == action_type and row['role'] == role
+            and row['username'] == username and row['marker'] is not None
+        }
+
+    def get_run(self, run_id: str) -> list:
+        """Log entries of one run, in the order they were recorded"""
+        conn = self._connect()
+        rows = conn.execute(
+            f'SELECT {", ".join(LEDGER_COLUMNS)} FROM action_ledger WHERE run_id = ? ORDER BY id',
+            (run_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+# Global instance
+action_ledger = ActionLedger()
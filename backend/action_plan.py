@@ -0,0 +1,79 @@
+import os
+import json
+from datetime import datetime
+from config import Config
+
+
+class ActionPlan:
+    """
+    Persisted dry run of approve/revoke/reject: every assignment checked with
+    its status snapshot, eligibility and skip reason. Executing the plan later
+    only acts on the eligible ids, after re-checking their current status.
+    """
+
+    def __init__(self, plan_id: str):
+        self.plan_id = plan_id
+        self.path = os.path.join(Config.PLAN_DIR, f'{plan_id}.json')
+        self.state = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> dict:
+        """Load plan, or None if there is no plan with this id"""
+        if not self.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.state = json.load(f)
+        return self.state
+
+    def save(self, params: dict, role: str, items: list) -> dict:
+        """Write the plan. items: check_eligibility results, in assignment order"""
+        self.state = {
+            'plan_id': self.plan_id,
+            'params': params,
+            'role': role,
+            'items': items,
+            'eligible': sum(1 for item in items if item['eligible']),
+            'total': len(items),
+            'created_at': datetime.now().isoformat()
+        }
+        os.makedirs(Config.PLAN_DIR, exist_ok=True)
+        # Write to temp file then rename, so a crash never leaves half a plan
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        return self.state
+
+    def eligible_items(self) -> list:
+        return [item for item in self.state['items'] if item['eligible']]
+
+    def discard(self):
+        if self.exists():
+            os.remove(self.path)
+
+
+def list_plans() -> list:
+    """List saved plans (without items), newest first"""
+    result = []
+    if not os.path.exists(Config.PLAN_DIR):
+        return result
+
+    for name in os.listdir(Config.PLAN_DIR):
+        if not name.endswith('.json'):
+            continue
+        state = ActionPlan(name[:-len('.json')]).load()
+        if not state:
+            continue
+        result.append({
+            'planId': state['plan_id'],
+            'params': state['params'],
+            'role': state['role'],
+            'eligible': state['eligible'],
+            'total': state['total'],
+            'createdAt': state['created_at']
+        })
+
+    result.sort(key=lambda x: x['createdAt'], reverse=True)
+    return result
@@ -10,7 +10,11 @@ class APIClient:
         pass
     
     def _get_session(self):
-        """Get valid session or raise error"""
+        """
+        Get valid session or raise error.
+        The session is pooled and applies default timeouts and retries
+        (see http_transport), so it is safe to call from worker threads.
+        """
         session = session_manager.get_session()
         if not session:
             raise Exception("Not logged in")
@@ -114,6 +118,9 @@ class APIClient:
         session = self._get_session()
         url = f'{Config.ASSIGNMENT_API}/assignments/get-principal-values-by-smallest-code/{survey_period_id}/{smallcode}'
         resp = session.get(url)
+        if resp.status_code in (401, 403):
+            # Expired session must not look like an empty smallcode
+            resp.raise_for_status()
         if resp.status_code != 200 or not resp.text.strip():
             return []
         return resp.json().get('data', [])
@@ -1,6 +1,9 @@
+import os
+import atexit
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from selenium_manager import selenium_manager
 
 # Import blueprints
 from routes.auth import auth_bp
@@ -8,15 +11,28 @@ from routes.survey import survey_bp
 from routes.region import region_bp
 from routes.action import action_bp
 from routes.wilayah import wilayah_bp
+from routes.schedule import schedule_bp
+from routes.action import launch_scheduled_job, is_task_active
+from scheduler import job_scheduler
 
 
-def create_app():
+def create_app(prewarm: bool = None, scheduler: bool = None):
     app = Flask(__name__)
     app.config.from_object(Config)
     
     # Initialize config
     Config.init_app(app)
     
+    # Park a ready browser for the first login / crash recovery
+    if Config.BROWSER_PREWARM if prewarm is None else prewarm:
+        selenium_manager.warm_up()
+        atexit.register(selenium_manager.close_standby)
+    
+    # Start saved jobs at their scheduled time
+    if Config.SCHEDULER_ENABLED if scheduler is None else scheduler:
+        job_scheduler.start(launch_scheduled_job, is_task_active)
+        atexit.register(job_scheduler.stop)
+    
     # Enable CORS for React frontend
     CORS(app, resources={
         r"/api/*": {
@@ -32,6 +48,7 @@ def create_app():
     app.register_blueprint(region_bp, url_prefix='/api/regions')
     app.register_blueprint(action_bp, url_prefix='/api/action')
     app.register_blueprint(wilayah_bp, url_prefix='/api/wilayah')
+    app.register_blueprint(schedule_bp, url_prefix='/api/schedule')
     
     @app.route('/')
     def index():
@@ -54,7 +71,12 @@ if __name__ == '__main__':
             return "localhost"
     
     local_ip = get_local_ip()
-    app = create_app()
+    # Debug reloader: only the serving child process warms a browser and runs scheduled jobs
+    serving = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    app = create_app(
+        prewarm=Config.BROWSER_PREWARM and serving,
+        scheduler=Config.SCHEDULER_ENABLED and serving
+    )
     
     print("=" * 50)
     print("🚀 FASIH-SM Backend Server")
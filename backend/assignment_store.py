@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+from config import Config
+from sqlite_store import SQLiteStore
+
+
+def history_marker(status_list: list) -> str:
+    """
+    Fingerprint of an assignment's history (entry count + latest date_created).
+    The answers only need refetching when this changes. None when there is no
+    dated history entry (Open/draft assignments): those are always refetched.
+    """
+    if not status_list or status_list[-1].get('date') is None:
+        return None
+    return f"{len(status_list)}:{status_list[-1]['date']}"
+
+
+class AssignmentStore(SQLiteStore):
+    """
+    Persistent last-seen answers per assignment, keyed by survey period and
+    assignment id, together with the history marker they were fetched at.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS assignment_snapshot (
+            period_id TEXT NOT NULL,
+            assignment_id TEXT NOT NULL,
+            history_marker TEXT NOT NULL,
+            status TEXT,
+            answers TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (period_id, assignment_id)
+        )
+    """
+    SYNCHRONOUS = 'NORMAL'
+    
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path or Config.ASSIGNMENT_STORE_PATH)
+    
+    def get(self, period_id: str, assignment_id: str, marker: str) -> dict:
+        """Get stored answers if they were fetched at the same history marker, else None"""
+        if marker is None:
+            return None
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT answers FROM assignment_snapshot '
+            'WHERE period_id = ? AND assignment_id = ? AND history_marker = ?',
+            (period_id, assignment_id, marker)
+        ).fetchone()
+        return json.loads(row['answers']) if row else None
+    
+    def put(self, period_id: str, assignment_id: str, marker: str, status: str, answers: dict):
+        """Store latest answers of an assignment (nothing to key them on without a marker)"""
+        if marker is None:
+            return
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO assignment_snapshot '
+                '(period_id, assignment_id, history_marker, status, answers, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (period_id, assignment_id, marker, status, json.dumps(answers, ensure_ascii=False), datetime.now().isoformat())
+            )
+
+
+# Global instance
+assignment_store = AssignmentStore()
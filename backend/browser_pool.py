@@ -0,0 +1,112 @@
+import queue
+import threading
+from selenium_manager import SeleniumManager, selenium_manager
+from config import Config
+
+
+class BrowserPool:
+    """
+    Pool of headless Chrome workers for parallel UI actions.
+    Every worker is seeded with the cookies of the logged-in browser
+    (selenium_manager) and checked before each use; a dead or logged-out
+    worker is recovered with the same inject/recover logic as the main browser.
+    With size <= 1 all work goes to the main browser, as before.
+    shutdown() drains the idle queue and leaves a CLOSED marker in it, which
+    wakes every caller still waiting for a worker; they then use the main browser.
+    """
+    
+    CLOSED = None
+    
+    def __init__(self):
+        self.workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._main_lock = threading.Lock()
+    
+    @property
+    def size(self) -> int:
+        return max(1, len(self.workers))
+    
+    def start(self, size: int = None) -> int:
+        """Launch and seed up to `size` workers (no-op if already running). Returns worker count"""
+        size = size or Config.BROWSER_POOL_SIZE
+        
+        with self._lock:
+            if size <= 1 or self.workers:
+                return self.size
+            
+            if not selenium_manager.is_logged_in:
+                return self.size
+            
+            # Drop the CLOSED marker of an earlier shutdown
+            self._drain()
+            
+            session_data = selenium_manager.get_saved_session_data()
+            for i in range(size):
+                worker = SeleniumManager(headless=True, profile=f'worker-{i + 1}')
+                result = worker.inject_saved_session(session_data)
+                if not result['success']:
+                    print(f"⚠️ Browser worker {i + 1} failed to start: {result['message']}")
+                    worker.close_driver()
+                    continue
+                self.workers.append(worker)
+                self._idle.put(worker)
+            
+            print(f"🧩 Browser pool started with {len(self.workers)} workers")
+            return self.size
+    
+    def shutdown(self):
+        """Close all workers and wake callers waiting for one"""
+        with self._lock:
+            for worker in self.workers:
+                worker.close_driver()
+            self.workers = []
+            self._drain()
+            self._idle.put(self.CLOSED)
+    
+    def _drain(self):
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                return
+    
+    def _ensure_healthy(self, worker: SeleniumManager) -> bool:
+        """Health check before use; re-seed from the main browser, then fall back to recover_session"""
+        if worker.check_browser_alive() and worker.is_logged_in:
+            return True
+        
+        print("⚠️ Browser worker unhealthy. Attempting to recover...")
+        if selenium_manager.is_logged_in:
+            result = worker.inject_saved_session(selenium_manager.get_saved_session_data())
+            if result['success']:
+                return True
+        return worker.recover_session()
+    
+    def navigate_and_click(self, url: str, button_id: str) -> dict:
+        """Run navigate_and_click on an idle worker (or the main browser if the pool is not running)"""
+        with self._lock:
+            pooled = bool(self.workers)
+        
+        worker = self._idle.get() if pooled else self.CLOSED
+        if worker is self.CLOSED:
+            if pooled:
+                # Pass the marker on to the next waiter
+                self._idle.put(self.CLOSED)
+            # Single login browser: callers may be concurrent, clicks must not be
+            with self._main_lock:
+                return selenium_manager.navigate_and_click(url, button_id)
+        
+        try:
+            if not self._ensure_healthy(worker):
+                return {'success': False, 'message': 'Browser worker recovery failed'}
+            return worker.navigate_and_click(url, button_id)
+        finally:
+            with self._lock:
+                # A worker closed by shutdown() meanwhile is not handed out again
+                if worker in self.workers:
+                    self._idle.put(worker)
+
+
+# Global instance
+browser_pool = BrowserPool()
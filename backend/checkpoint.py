@@ -0,0 +1,130 @@
+import os
+import json
+import shutil
+from datetime import datetime
+from exporter import RowSpool
+from config import Config
+
+
+class DownloadCheckpoint:
+    """
+    On-disk checkpoint of a raw data download, committed once per smallcode.
+    Holds the task parameters, how many smallcodes are finished and the spool
+    offset at that point, so a restarted task can continue at the first
+    unfinished smallcode. The smallcode list itself is written once, next to
+    the state, so a commit stays small however big the kabupaten is.
+    """
+    
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.dir = os.path.join(Config.CHECKPOINT_DIR, task_id)
+        self.state_path = os.path.join(self.dir, 'state.json')
+        self.smallcodes_path = os.path.join(self.dir, 'smallcodes.json')
+        self.spool_path = os.path.join(self.dir, 'rows.jsonl')
+        self.state = None
+    
+    def exists(self) -> bool:
+        return os.path.exists(self.state_path)
+    
+    def read_state(self) -> dict:
+        """Checkpoint state without the smallcode list, or None if there is no checkpoint"""
+        if not self.exists():
+            return None
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def load(self) -> dict:
+        """Load checkpoint state including 'smallcodes', or None if there is no checkpoint"""
+        state = self.read_state()
+        if state is None:
+            return None
+        if 'smallcodes' not in state:
+            # Checkpoints of older versions keep the list inside state.json
+            with open(self.smallcodes_path, 'r', encoding='utf-8') as f:
+                state['smallcodes'] = json.load(f)
+        state.setdefault('total', len(state['smallcodes']))
+        self.state = state
+        return self.state
+    
+    def start(self, params: dict, smallcodes: list) -> dict:
+        """Create a fresh checkpoint for a new download"""
+        os.makedirs(self.dir, exist_ok=True)
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+        self._write_json(self.smallcodes_path, smallcodes)
+        self.state = {
+            'task_id': self.task_id,
+            'params': params,
+            'smallcodes': smallcodes,
+            'total': len(smallcodes),
+            'completed': 0,
+            'offset': 0,
+            'rows': 0,
+            'columns': [],
+            'total_assignments': 0,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+        self._write_state()
+        return self.state
+    
+    def open_spool(self) -> RowSpool:
+        """Open the row spool, rolled back to the last committed smallcode"""
+        return RowSpool(
+            self.dir,
+            path=self.spool_path,
+            offset=self.state['offset'],
+            columns=self.state['columns'],
+            count=self.state['rows']
+        )
+    
+    def commit(self, completed: int, spool: RowSpool, total_assignments: int):
+        """Record that the first `completed` smallcodes are fully spooled"""
+        self.state.update({
+            'completed': completed,
+            'offset': spool.tell(),
+            'rows': spool.count,
+            'columns': spool.columns,
+            'total_assignments': total_assignments,
+            'updated_at': datetime.now().isoformat()
+        })
+        self._write_state()
+    
+    def discard(self):
+        """Remove checkpoint after the final file is written"""
+        shutil.rmtree(self.dir, ignore_errors=True)
+    
+    def _write_state(self):
+        state = {key: value for key, value in self.state.items() if key != 'smallcodes'}
+        self._write_json(self.state_path, state)
+    
+    @staticmethod
+    def _write_json(path: str, data):
+        # Write to temp file then rename, so a crash never leaves half a file
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def list_checkpoints() -> list:
+    """List unfinished download checkpoints, newest first"""
+    result = []
+    if not os.path.exists(Config.CHECKPOINT_DIR):
+        return result
+    
+    for task_id in os.listdir(Config.CHECKPOINT_DIR):
+        state = DownloadCheckpoint(task_id).read_state()
+        if not state:
+            continue
+        result.append({
+            'taskId': task_id,
+            'params': state['params'],
+            'completed': state['completed'],
+            'total': state['total'] if 'total' in state else len(state['smallcodes']),
+            'rows': state['rows'],
+            'updatedAt': state['updated_at']
+        })
+    
+    result.sort(key=lambda x: x['updatedAt'], reverse=True)
+    return result
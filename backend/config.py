@@ -1,4 +1,5 @@
 import os
+import json
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'fasih-sm-secret-key-2026')
@@ -17,12 +18,118 @@ class Config:
     REGION_API = f'{FASIH_BASE_URL}/region/api/v1'
     ASSIGNMENT_API = f'{FASIH_BASE_URL}/assignment-general/api'
     
+    # HTTP transport (connection pool, timeouts, retry policy)
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 32))
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))
+    
+    # Action executor for approve/revoke/reject: 'auto' (HTTP with Selenium fallback),
+    # 'http' or 'selenium'. HTTP endpoints are URL templates with {base} (ASSIGNMENT_API),
+    # {assignment_id}, {period_id} and {template_id}; an action without an endpoint uses Selenium.
+    ACTION_EXECUTOR = os.environ.get('ACTION_EXECUTOR', 'auto')
+    ACTION_API_ENDPOINTS = {
+        'approve': os.environ.get('ACTION_API_APPROVE_URL', ''),
+        'revoke': os.environ.get('ACTION_API_REVOKE_URL', ''),
+        'reject': os.environ.get('ACTION_API_REJECT_URL', '')
+    }
+    # JSON body posted to the endpoint; string values are templates with the same fields as the URL
+    ACTION_API_PAYLOAD = json.loads(os.environ.get(
+        'ACTION_API_PAYLOAD', '{"assignmentId": "{assignment_id}", "surveyPeriodId": "{period_id}"}'
+    ))
+    # Concurrent actions when HTTP is the primary executor (Selenium runs one per browser)
+    ACTION_HTTP_WORKERS = int(os.environ.get('ACTION_HTTP_WORKERS', 4))
+    
+    # Headless browser workers for parallel UI actions (1 = use the login browser only)
+    BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 1))
+    
+    # Fast browser mode: headless, no images/fonts, third-party assets blocked and a
+    # persistent profile per browser so the FASIH SPA bundle is served from disk cache
+    BROWSER_FAST_MODE = os.environ.get('BROWSER_FAST_MODE', '').lower() in ('1', 'true', 'yes')
+    BROWSER_BLOCKED_URLS = [
+        pattern.strip() for pattern in os.environ.get(
+            'BROWSER_BLOCKED_URLS',
+            '*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,'
+            '*fonts.googleapis.com*,*fonts.gstatic.com*,'
+            '*.woff,*.woff2,*.ttf,*.otf,*.png,*.jpg,*.jpeg,*.gif,*.webp,*.ico'
+        ).split(',') if pattern.strip()
+    ]
+    
+    # Seconds the survey page URL must stay put (no client-side redirect to SSO)
+    # before an injected session counts as valid
+    BROWSER_URL_SETTLE = float(os.environ.get('BROWSER_URL_SETTLE', 3))
+    
+    # Route review pages inside the already loaded FASIH app (history.pushState) instead of
+    # a full page load; falls back to a full load when the view does not re-render in time and
+    # stays on full loads for that browser afterwards. Off by default: opt in once verified
+    BROWSER_SPA_NAVIGATION = os.environ.get('BROWSER_SPA_NAVIGATION', '').lower() in ('1', 'true', 'yes')
+    BROWSER_SPA_TIMEOUT = float(os.environ.get('BROWSER_SPA_TIMEOUT', 10))
+    
+    # Launch a standby login browser at server start and keep one ready after crashes
+    BROWSER_PREWARM = os.environ.get('BROWSER_PREWARM', '').lower() in ('1', 'true', 'yes')
+    
+    # Scheduled jobs: started at their time (or up to SCHEDULER_CATCHUP_HOURS later if the
+    # server was down or all SCHEDULER_MAX_CONCURRENT slots were busy). Off by default:
+    # saved jobs act on FASIH unattended, so the runner has to be switched on explicitly
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SCHEDULER_MAX_CONCURRENT = int(os.environ.get('SCHEDULER_MAX_CONCURRENT', 1))
+    SCHEDULER_CATCHUP_HOURS = float(os.environ.get('SCHEDULER_CATCHUP_HOURS', 2))
+    SCHEDULER_POLL_INTERVAL = float(os.environ.get('SCHEDULER_POLL_INTERVAL', 30))
+    
+    # Concurrent fetching (keep FETCH_WORKERS below HTTP_POOL_MAXSIZE)
+    FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 8))
+    
+    # Background tasks (downloads, approve/revoke/reject, plans) running at once; the rest wait in queue
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+    
+    # Task progress memory bound: log lines kept per task (full log in TASK_LOG_DIR),
+    # seconds a finished task stays queryable
+    TASK_LOG_BUFFER = int(os.environ.get('TASK_LOG_BUFFER', 200))
+    TASK_PROGRESS_TTL = int(os.environ.get('TASK_PROGRESS_TTL', 6 * 3600))
+    # Task state backend ('sqlite' shares progress across processes and restarts, 'memory' keeps
+    # it in the running process only); changes are flushed every TASK_STATE_FLUSH_INTERVAL seconds
+    # and an active task without a heartbeat for TASK_STATE_STALE_AFTER seconds counts as interrupted
+    TASK_STATE_BACKEND = os.environ.get('TASK_STATE_BACKEND', 'sqlite')
+    TASK_STATE_FLUSH_INTERVAL = float(os.environ.get('TASK_STATE_FLUSH_INTERVAL', 1))
+    TASK_STATE_STALE_AFTER = float(os.environ.get('TASK_STATE_STALE_AFTER', 120))
+    
+    # Progress stream (SSE): seconds between change checks / keep-alive comments
+    PROGRESS_STREAM_INTERVAL = float(os.environ.get('PROGRESS_STREAM_INTERVAL', 0.5))
+    PROGRESS_STREAM_HEARTBEAT = float(os.environ.get('PROGRESS_STREAM_HEARTBEAT', 15))
+    
+    # Checked assignments buffered between the eligibility stage and the action stage
+    ACTION_QUEUE_SIZE = int(os.environ.get('ACTION_QUEUE_SIZE', 200))
+    
     # Output directories - organized by category
     OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
     SESSION_DIR = os.path.join(OUTPUT_DIR, 'session')
     WILAYAH_DIR = os.path.join(OUTPUT_DIR, 'wilayah')
     RAW_DATA_DIR = os.path.join(OUTPUT_DIR, 'raw_data')
     LOG_DIR = os.path.join(OUTPUT_DIR, 'log')
+    CHECKPOINT_DIR = os.path.join(OUTPUT_DIR, 'checkpoint')
+    PLAN_DIR = os.path.join(OUTPUT_DIR, 'plan')
+    TASK_LOG_DIR = os.path.join(LOG_DIR, 'tasks')
+    BROWSER_PROFILE_DIR = os.path.join(OUTPUT_DIR, 'browser_profile')
+    
+    # Resolved chromedriver path + the Chrome version it matches
+    DRIVER_CACHE_PATH = os.path.join(OUTPUT_DIR, 'chromedriver.json')
+    
+    # Region tree store shared by every survey/period using the same regionGroupId
+    REGION_STORE_PATH = os.path.join(WILAYAH_DIR, 'region_store.db')
+    
+    # Last-seen assignment answers for incremental raw data downloads
+    ASSIGNMENT_STORE_PATH = os.path.join(RAW_DATA_DIR, 'assignment_store.db')
+    
+    # Shared task progress (see TASK_STATE_BACKEND)
+    TASK_STATE_PATH = os.path.join(LOG_DIR, 'task_state.db')
+    
+    # Saved scheduled job definitions
+    SCHEDULE_STORE_PATH = os.path.join(OUTPUT_DIR, 'schedule.db')
+    
+    # Append-only approve/revoke/reject outcomes (reruns skip what already succeeded)
+    ACTION_LEDGER_PATH = os.path.join(LOG_DIR, 'action_ledger.db')
     
     @staticmethod
     def init_app(app):
@@ -32,3 +139,7 @@ class Config:
         os.makedirs(Config.WILAYAH_DIR, exist_ok=True)
         os.makedirs(Config.RAW_DATA_DIR, exist_ok=True)
         os.makedirs(Config.LOG_DIR, exist_ok=True)
+        os.makedirs(Config.CHECKPOINT_DIR, exist_ok=True)
+        os.makedirs(Config.PLAN_DIR, exist_ok=True)
+        os.makedirs(Config.TASK_LOG_DIR, exist_ok=True)
+        os.makedirs(Config.BROWSER_PROFILE_DIR, exist_ok=True)
@@ -0,0 +1,88 @@
+import os
+import json
+import threading
+from datetime import datetime
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+from config import Config
+
+
+class DriverCache:
+    """
+    Local cache of the resolved chromedriver binary.
+    The path is stored together with the Chrome version it was resolved for;
+    webdriver_manager (network) is only contacted when the installed Chrome
+    major version differs, the binary is gone, or a forced refresh is requested.
+    """
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path or Config.DRIVER_CACHE_PATH
+        self._lock = threading.Lock()
+        self._resolved = None
+
+    @staticmethod
+    def get_chrome_version() -> str:
+        """Installed Chrome version from the OS (no network), or None if unknown"""
+        try:
+            return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _major(version: str) -> str:
+        return version.split('.')[0] if version else None
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, driver_path: str, chrome_version: str):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'driver_path': driver_path,
+                'chrome_version': chrome_version,
+                'resolved_at': datetime.now().isoformat()
+            }, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def resolve(self, force: bool = False) -> str:
+        """Path of a chromedriver matching the installed Chrome"""
+        with self._lock:
+            # Already verified in this process
+            if not force and self._resolved and os.path.exists(self._resolved):
+                return self._resolved
+
+            cached = None if force else self._load()
+            chrome_version = self.get_chrome_version()
+
+            if cached and os.path.exists(cached.get('driver_path', '')):
+                # Unknown Chrome version (detection failed): trust the cache rather than go online
+                if chrome_version is None or self._major(chrome_version) == self._major(cached.get('chrome_version')):
+                    self._resolved = cached['driver_path']
+                    return self._resolved
+                print(f"🔄 Chrome updated ({cached.get('chrome_version')} -> {chrome_version}), resolving chromedriver...")
+
+            try:
+                driver_path = ChromeDriverManager().install()
+            except Exception:
+                # Offline: an existing binary is better than no browser at all
+                if cached and os.path.exists(cached.get('driver_path', '')):
+                    print("⚠️ chromedriver lookup failed, using cached driver")
+                    self._resolved = cached['driver_path']
+                    return self._resolved
+                raise
+
+            self._save(driver_path, chrome_version)
+            self._resolved = driver_path
+            return driver_path
+
+
+# Global instance
+driver_cache = DriverCache()
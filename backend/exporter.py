@@ -0,0 +1,203 @@
+import os
+import csv
+import json
+import tempfile
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+
+# Supported output formats: extension -> mimetype
+OUTPUT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+PARQUET_BATCH_SIZE = 5000
+PARQUET_COMPRESSION = 'zstd'
+
+
+class RowSpool:
+    """
+    Append-only spool of output rows on disk (JSON lines).
+    Keeps only the column union in memory, so the full dataset never has to
+    be held in RAM before the final column order is known.
+    """
+    
+    def __init__(self, dirpath: str, prefix: str = 'spool_', path: str = None,
+                 offset: int = None, columns: list = None, count: int = 0):
+        """
+        Create a temporary spool in dirpath, or reopen an existing spool at
+        `path` truncated to `offset` (rows written after a checkpoint are dropped).
+        """
+        os.makedirs(dirpath, exist_ok=True)
+        if path:
+            self.path = path
+            if offset is not None and os.path.exists(path):
+                os.truncate(path, offset)
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            fd, self.path = tempfile.mkstemp(prefix=prefix, suffix='.jsonl', dir=dirpath)
+            self._file = os.fdopen(fd, 'w', encoding='utf-8')
+        self._columns = dict.fromkeys(columns or [])
+        self.count = count
+    
+    @property
+    def columns(self) -> list:
+        """Columns seen so far, in first-seen order"""
+        return list(self._columns)
+    
+    def append(self, row: dict):
+        for key in row:
+            self._columns.setdefault(key, None)
+        self._file.write(json.dumps(row, ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+    
+    def tell(self) -> int:
+        """Flush and return current size of spool file (checkpoint offset)"""
+        self._file.flush()
+        return self._file.tell()
+    
+    def __iter__(self):
+        self._file.flush()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+    
+    def close(self, delete: bool = True):
+        """Close spool file, deleting it unless it is kept for a later resume"""
+        if not self._file.closed:
+            self._file.close()
+        if delete and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_xlsx_stream(filepath: str, columns: list, rows) -> int:
+    """
+    Write rows (iterable of dicts) to xlsx with a write-only workbook,
+    so memory stays constant regardless of row count. Missing values are
+    written as empty strings. Returns number of rows written.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    
+    count = 0
+    for row in rows:
+        ws.append([row.get(col, '') for col in columns])
+        count += 1
+    
+    wb.save(filepath)
+    return count
+
+
+def write_csv_stream(filepath: str, columns: list, rows) -> int:
+    """Write rows to CSV (UTF-8 with BOM so Excel opens it correctly). Returns row count"""
+    count = 0
+    with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval='', extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet_stream(filepath: str, columns: list, rows) -> int:
+    """Write rows to compressed Parquet in row-group batches (all columns as strings)"""
+    if pa is None:
+        raise Exception("Parquet output requires pyarrow (pip install pyarrow)")
+    
+    schema = pa.schema([(col, pa.string()) for col in columns])
+    count = 0
+    batch = []
+    
+    def flush(writer):
+        data = {col: [row.get(col, '') for row in batch] for col in columns}
+        writer.write_table(pa.Table.from_pydict(data, schema=schema))
+        batch.clear()
+    
+    with pq.ParquetWriter(filepath, schema, compression=PARQUET_COMPRESSION) as writer:
+        for row in rows:
+            batch.append(row)
+            count += 1
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                flush(writer)
+        if batch or count == 0:
+            flush(writer)
+    return count
+
+
+STREAM_WRITERS = {
+    'xlsx': write_xlsx_stream,
+    'csv': write_csv_stream,
+    'parquet': write_parquet_stream
+}
+
+
+def get_format(filename: str) -> str:
+    """Get output format from filename extension, or None if unsupported"""
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    return ext if ext in OUTPUT_FORMATS else None
+
+
+def write_rows(filepath: str, columns: list, rows) -> int:
+    """Stream rows to filepath in the format given by its extension"""
+    fmt = get_format(filepath)
+    if not fmt:
+        raise Exception(f"Unsupported output format: {filepath}")
+    return STREAM_WRITERS[fmt](filepath, columns, rows)
+
+
+def write_dataframe(df: pd.DataFrame, filepath: str):
+    """Write a DataFrame in the format given by the file extension"""
+    fmt = get_format(filepath)
+    if fmt == 'parquet':
+        if pa is None:
+            raise Exception("Parquet output requires pyarrow (pip install pyarrow)")
+        df.fillna('').astype(str).to_parquet(filepath, index=False, compression=PARQUET_COMPRESSION)
+    elif fmt == 'csv':
+        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+    elif fmt == 'xlsx':
+        df.to_excel(filepath, index=False)
+    else:
+        raise Exception(f"Unsupported output format: {filepath}")
+
+
+def read_columns(filepath: str) -> list:
+    """Read only the header (column names) of an output file"""
+    fmt = get_format(filepath)
+    if fmt == 'parquet':
+        if pq is None:
+            raise Exception("Reading Parquet requires pyarrow (pip install pyarrow)")
+        return list(pq.read_schema(filepath).names)
+    if fmt == 'csv':
+        with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+            return next(csv.reader(f), [])
+    
+    wb = load_workbook(filepath, read_only=True)
+    try:
+        header = next(wb.active.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        return [c for c in header if c is not None]
+    finally:
+        wb.close()
+
+
+def read_table(filepath: str, columns: list = None) -> pd.DataFrame:
+    """Read an output file into a DataFrame, optionally only some columns"""
+    fmt = get_format(filepath)
+    if fmt == 'parquet':
+        if pq is None:
+            raise Exception("Reading Parquet requires pyarrow (pip install pyarrow)")
+        return pd.read_parquet(filepath, columns=columns)
+    if fmt == 'csv':
+        return pd.read_csv(filepath, usecols=columns, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    return pd.read_excel(filepath, usecols=columns)
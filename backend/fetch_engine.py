@@ -0,0 +1,80 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+
+def bounded_map(fn, items, max_workers: int = None, max_pending: int = None):
+    """
+    Apply fn to each item on a thread pool and yield results in input order.
+    At most max_pending calls are in flight at once, so items can be a lazy
+    iterator of any length. Exceptions raised by fn are re-raised when its
+    result is reached, so fn should handle errors it wants to log.
+    """
+    max_workers = max(1, max_workers or Config.FETCH_WORKERS)
+    max_pending = max(max_workers, max_pending or max_workers * 2)
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early (error or generator closed): drop queued work
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def prefetch(items, maxsize: int = 0):
+    """
+    Drive items on a background producer thread and yield them through a
+    bounded queue, so the producer keeps working while the consumer is busy.
+    An exception raised by items is re-raised at the consumer.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    end = object()
+    
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+        finally:
+            # Generators must be closed on the thread that runs them
+            close = getattr(items, 'close', None)
+            if close:
+                close()
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
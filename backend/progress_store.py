@@ -0,0 +1,380 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from config import Config
+from sqlite_store import SQLiteStore
+
+
+FINISHED_STATUSES = ('completed', 'error', 'cancelled')
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class LogBuffer:
+    """
+    Task log lines: every line is appended to a file on disk, only the last
+    `capacity` stay in memory. Lines are numbered from 0 in append order;
+    `size` is the byte length of the file up to line `total`.
+    """
+
+    def __init__(self, path: str, capacity: int = None, total: int = 0, size: int = 0, on_append=None):
+        self.path = path
+        self.total = total
+        self.size = size
+        self._lines = deque(maxlen=capacity or Config.TASK_LOG_BUFFER)
+        self._lock = threading.Lock()
+        self._on_append = on_append
+
+    def append(self, line: str):
+        # One log line = one file line, so cursors match across processes
+        line = str(line).replace('\n', ' ')
+        data = f'{line}\n'.encode('utf-8')
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+            self._lines.append(line)
+            self.total += 1
+            self.size += len(data)
+        if self._on_append:
+            self._on_append()
+
+    def tail(self) -> list:
+        """Lines still in memory (the most recent ones)"""
+        with self._lock:
+            return list(self._lines)
+
+    def since(self, cursor: int) -> tuple:
+        """
+        Lines numbered >= cursor that are still in memory.
+        Returns (lines, next_cursor, gap); gap is True when some requested
+        lines already left the buffer (they are only in the log file).
+        """
+        with self._lock:
+            return slice_lines(list(self._lines), self.total, cursor)
+
+    def __iter__(self):
+        return iter(self.tail())
+
+    def __len__(self) -> int:
+        return self.total
+
+
+def slice_lines(lines: list, total: int, cursor: int) -> tuple:
+    """(lines numbered >= cursor, total, gap) out of the last len(lines) of total lines"""
+    first = total - len(lines)
+    start = max(cursor, first)
+    return (lines[start - first:] if start < total else []), total, cursor < first
+
+
+def read_log_tail(path: str, size: int, max_lines: int) -> list:
+    """Last max_lines lines of the first `size` bytes of a log file, read backwards from the end"""
+    if not size or not os.path.exists(path):
+        return []
+
+    block = 64 * 1024
+    data = b''
+    with open(path, 'rb') as f:
+        end = size
+        while end > 0 and data.count(b'\n') <= max_lines:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+
+    lines = data.decode('utf-8', errors='replace').split('\n')[:-1]
+    if end > 0:
+        # First line may be cut by the block boundary
+        lines = lines[1:]
+    return lines[-max_lines:]
+
+
+def scan_log(path: str) -> tuple:
+    """
+    (line count, byte size) of an existing log file. A line cut off by a crash
+    mid-write is dropped from the file, so the next append starts a fresh line.
+    """
+    if not os.path.exists(path):
+        return 0, 0
+
+    lines = 0
+    size = 0
+    with open(path, 'rb+') as f:
+        while True:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            newlines = chunk.count(b'\n')
+            if newlines:
+                lines += newlines
+                size = f.tell() - (len(chunk) - chunk.rfind(b'\n') - 1)
+        if f.tell() != size:
+            f.truncate(size)
+    return lines, size
+
+
+class TaskProgress(dict):
+    """Progress entry of one task; 'logs' is a LogBuffer, finish time is tracked for eviction"""
+
+    def __init__(self, values: dict, logs: LogBuffer, on_change=None):
+        values = {k: v for k, v in values.items() if k != 'logs'}
+        super().__init__(values, logs=logs)
+        self.finished_at = time.time() if values.get('status') in FINISHED_STATUSES else None
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        if key == 'status':
+            self.finished_at = time.time() if value in FINISHED_STATUSES else None
+        super().__setitem__(key, value)
+        if self._on_change:
+            # Status changes are written through at once, counters in batches
+            self._on_change(key == 'status')
+
+    def fields(self) -> dict:
+        """Everything but the logs"""
+        data = dict(self)
+        data.pop('logs', None)
+        return data
+
+    def snapshot(self, since: int = None) -> dict:
+        """
+        JSON-safe copy. Without since: the in-memory log tail. With since: only
+        log lines after that cursor (log_gap tells if some were dropped from memory).
+        log_cursor is the value to pass as since next time.
+        """
+        data = self.fields()
+        if since is None:
+            data['logs'] = self['logs'].tail()
+            data['log_cursor'] = self['logs'].total
+        else:
+            data['logs'], data['log_cursor'], data['log_gap'] = self['logs'].since(since)
+        data['log_total'] = data['log_cursor']
+        return data
+
+
+class MemoryTaskBackend:
+    """Task state lives only in the process that runs the task (single process, lost on restart)"""
+
+    def save(self, task_id: str, fields: dict, log_total: int, log_size: int, finished_at: float):
+        pass
+
+    def load(self, task_id: str) -> dict:
+        return None
+
+    def delete_finished_before(self, cutoff: float) -> list:
+        return []
+
+
+class SQLiteTaskBackend(SQLiteStore):
+    """
+    Task state shared through SQLite: fields (status, counters, filename, ...)
+    plus the log line count and byte size, so any process can answer progress
+    queries from the row and the task's log file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS task_state (
+            task_id TEXT PRIMARY KEY,
+            status TEXT,
+            fields TEXT NOT NULL,
+            log_total INTEGER NOT NULL,
+            log_size INTEGER NOT NULL,
+            finished_at REAL,
+            updated_at REAL NOT NULL
+        )
+    """
+    SYNCHRONOUS = 'NORMAL'
+
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path or Config.TASK_STATE_PATH)
+
+    def save(self, task_id: str, fields: dict, log_total: int, log_size: int, finished_at: float):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO task_state '
+                '(task_id, status, fields, log_total, log_size, finished_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (task_id, fields.get('status'), json.dumps(fields, ensure_ascii=False, default=str),
+                 log_total, log_size, finished_at, time.time())
+            )
+
+    def load(self, task_id: str) -> dict:
+        """{ fields, log_total, log_size, finished_at, updated_at } or None"""
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM task_state WHERE task_id = ?', (task_id,)).fetchone()
+        if not row:
+            return None
+        return {
+            'fields': json.loads(row['fields']),
+            'log_total': row['log_total'],
+            'log_size': row['log_size'],
+            'finished_at': row['finished_at'],
+            'updated_at': row['updated_at']
+        }
+
+    def delete_finished_before(self, cutoff: float) -> list:
+        """Drop tasks finished before cutoff, returns their ids"""
+        with self._write_lock, self._connect() as conn:
+            rows = conn.execute(
+                'SELECT task_id FROM task_state WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,)
+            ).fetchall()
+            conn.execute('DELETE FROM task_state WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,))
+        return [row['task_id'] for row in rows]
+
+
+TASK_BACKENDS = {
+    'memory': MemoryTaskBackend,
+    'sqlite': SQLiteTaskBackend
+}
+
+
+def create_task_backend(name: str = None):
+    """Task state backend by name (Config.TASK_STATE_BACKEND)"""
+    name = (name or Config.TASK_STATE_BACKEND).lower()
+    if name not in TASK_BACKENDS:
+        raise ValueError(f'Unknown task state backend: {name}')
+    return TASK_BACKENDS[name]()
+
+
+class ProgressStore:
+    """
+    Thread-safe map of task id -> TaskProgress with bounded memory: each task
+    keeps a capped log ring buffer (full log on disk) and finished tasks are
+    evicted after TASK_PROGRESS_TTL seconds.
+    Assigning a plain dict replaces the fields of a task but keeps its log.
+    Tasks run by this process are mirrored to the task state backend, so
+    snapshot() also answers for tasks of other processes or from before a restart.
+    """
+
+    def __init__(self, log_dir: str = None, ttl: float = None, backend=None):
+        self.log_dir = log_dir or Config.TASK_LOG_DIR
+        self.ttl = Config.TASK_PROGRESS_TTL if ttl is None else ttl
+        self.backend = backend or create_task_backend()
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._flusher = None
+
+    def log_path(self, task_id: str) -> str:
+        return os.path.join(self.log_dir, f'{task_id}.log')
+
+    def _remove_log(self, task_id: str):
+        """Delete the log file of an expired task (its record is gone, nothing reads it)"""
+        try:
+            os.remove(self.log_path(task_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Could not remove task log {task_id}: {e}")
+
+    def __setitem__(self, task_id: str, values: dict):
+        with self._lock:
+            self._evict()
+            current = self._tasks.get(task_id)
+            if current is not None:
+                logs = current['logs']
+            else:
+                os.makedirs(self.log_dir, exist_ok=True)
+                path = self.log_path(task_id)
+                # Task resumed after a restart: keep numbering lines after those in the file
+                # (the stored log_total can be a flush interval behind it)
+                total, size = scan_log(path)
+                logs = LogBuffer(path, total=total, size=size, on_append=lambda: self._changed(task_id))
+            self._tasks[task_id] = TaskProgress(values, logs, on_change=lambda force: self._changed(task_id, force))
+        self._changed(task_id, True)
+
+    def __getitem__(self, task_id: str) -> TaskProgress:
+        with self._lock:
+            return self._tasks[task_id]
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._tasks
+
+    def get(self, task_id: str, default=None):
+        with self._lock:
+            return self._tasks.get(task_id, default)
+
+    def snapshot(self, task_id: str, since: int = None) -> dict:
+        """JSON-safe progress of a task (see TaskProgress.snapshot), or None if unknown/evicted"""
+        with self._lock:
+            self._evict()
+            progress = self._tasks.get(task_id)
+        if progress is not None:
+            return progress.snapshot(since)
+        return self._stored_snapshot(task_id, since)
+
+    def _stored_snapshot(self, task_id: str, since: int = None) -> dict:
+        """Snapshot of a task this process does not run, from the backend and the log file"""
+        stored = self.backend.load(task_id)
+        if stored is None:
+            return None
+        if stored['finished_at'] is not None and stored['finished_at'] < time.time() - self.ttl:
+            return None
+
+        data = stored['fields']
+        if data.get('status') in ACTIVE_STATUSES and stored['updated_at'] < time.time() - Config.TASK_STATE_STALE_AFTER:
+            # No heartbeat from the owning process: it stopped (restart or crash)
+            data['status'] = 'error'
+            data['message'] = 'Task interrupted (server stopped)'
+
+        lines = read_log_tail(self.log_path(task_id), stored['log_size'], Config.TASK_LOG_BUFFER)
+        if since is None:
+            data['logs'], data['log_cursor'] = lines, stored['log_total']
+        else:
+            data['logs'], data['log_cursor'], data['log_gap'] = slice_lines(lines, stored['log_total'], since)
+        data['log_total'] = data['log_cursor']
+        return data
+
+    def _changed(self, task_id: str, force: bool = False):
+        """Mirror a local task to the backend: at once when forced, else on the next flush"""
+        if force:
+            self._flush(task_id)
+            return
+        with self._dirty_lock:
+            self._dirty.add(task_id)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name='progress-flusher')
+                self._flusher.start()
+
+    def _flush(self, task_id: str):
+        progress = self.get(task_id)
+        if progress is None:
+            return
+        logs = progress['logs']
+        try:
+            self.backend.save(task_id, progress.fields(), logs.total, logs.size, progress.finished_at)
+        except Exception as e:
+            print(f"⚠️ Could not save task state {task_id}: {e}")
+
+    def _flush_loop(self):
+        last_heartbeat = time.time()
+        while True:
+            time.sleep(Config.TASK_STATE_FLUSH_INTERVAL)
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+
+            if time.time() - last_heartbeat >= Config.TASK_STATE_STALE_AFTER / 4:
+                # Heartbeat: active tasks without changes still look alive to other processes
+                with self._lock:
+                    dirty |= {task_id for task_id, progress in self._tasks.items() if progress.get('status') in ACTIVE_STATUSES}
+                try:
+                    for task_id in self.backend.delete_finished_before(time.time() - self.ttl):
+                        self._remove_log(task_id)
+                except Exception as e:
+                    print(f"⚠️ Could not prune task state: {e}")
+                last_heartbeat = time.time()
+
+            for task_id in dirty:
+                self._flush(task_id)
+
+    def _evict(self):
+        """Drop finished tasks older than the TTL and their log files (caller holds the lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [
+            task_id for task_id, progress in self._tasks.items()
+            if progress.finished_at is not None and progress.finished_at < cutoff
+        ]
+        for task_id in expired:
+            del self._tasks[task_id]
+            self._remove_log(task_id)
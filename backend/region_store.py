@@ -0,0 +1,250 @@
+import json
+from datetime import datetime
+from api_client import api_client
+from config import Config
+from sqlite_store import SQLiteStore
+
+
+class RegionStore(SQLiteStore):
+    """
+    Persistent region tree keyed by regionGroupId and parent node.
+    Children of a node are fetched from FASIH-SM once and then served from
+    disk, so every survey and period sharing a regionGroupId reuses them.
+    Also holds the flattened smallcode list per kabupaten (wilayah cache)
+    with a header row, so status checks and per-kecamatan loads are cheap.
+    
+    Parent keys per level: level1 -> '' , level2 -> provinsi fullCode,
+    level3+ -> parent node id (same parameters the region API takes).
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS region_node (
+            group_id TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            parent_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            id TEXT NOT NULL,
+            code TEXT,
+            full_code TEXT,
+            name TEXT,
+            PRIMARY KEY (group_id, level, parent_id, position)
+        );
+        CREATE TABLE IF NOT EXISTS region_fetched (
+            group_id TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            parent_id TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (group_id, level, parent_id)
+        );
+        CREATE TABLE IF NOT EXISTS region_metadata (
+            group_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            fetched_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS wilayah_cache (
+            group_id TEXT NOT NULL,
+            kab_id TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            survey_id TEXT,
+            period_id TEXT,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (group_id, kab_id)
+        );
+        CREATE TABLE IF NOT EXISTS wilayah_smallcode (
+            group_id TEXT NOT NULL,
+            kab_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            smallcode TEXT NOT NULL,
+            kecamatan TEXT,
+            desa TEXT,
+            sls TEXT,
+            PRIMARY KEY (group_id, kab_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_wilayah_kecamatan
+            ON wilayah_smallcode (group_id, kab_id, kecamatan);
+    """
+    
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path or Config.REGION_STORE_PATH)
+    
+    # APIClient method fetching the children of each level
+    LEVEL_FETCHERS = {
+        1: 'get_provinsi',
+        2: 'get_kabupaten',
+        3: 'get_kecamatan',
+        4: 'get_desa',
+        5: 'get_sls',
+        6: 'get_subsls'
+    }
+    
+    def _fetch_from_api(self, group_id: str, level: int, parent_id: str) -> list:
+        """Fetch children of a node from FASIH-SM region API"""
+        fetch = getattr(api_client, self.LEVEL_FETCHERS[level])
+        if level == 1:
+            return fetch(group_id)
+        return fetch(group_id, parent_id)
+    
+    # ============ METADATA ============
+    
+    def get_metadata(self, group_id: str, refresh: bool = False) -> dict:
+        """Get region metadata response (cached per group)"""
+        conn = self._connect()
+        if not refresh:
+            row = conn.execute('SELECT data FROM region_metadata WHERE group_id = ?', (group_id,)).fetchone()
+            if row:
+                return json.loads(row['data'])
+        
+        data = api_client.get_region_metadata(group_id)
+        with self._write_lock, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO region_metadata (group_id, data, fetched_at) VALUES (?, ?, ?)',
+                (group_id, json.dumps(data), datetime.now().isoformat())
+            )
+        return data
+    
+    # ============ NODES ============
+    
+    def get_children(self, group_id: str, level: int, parent_id: str, refresh: bool = False) -> list:
+        """Get child nodes at `level` under `parent_id`, fetching from API only on a miss"""
+        parent_id = parent_id or ''
+        
+        conn = self._connect()
+        if not refresh:
+            fetched = conn.execute(
+                'SELECT 1 FROM region_fetched WHERE group_id = ? AND level = ? AND parent_id = ?',
+                (group_id, level, parent_id)
+            ).fetchone()
+            if fetched:
+                rows = conn.execute(
+                    'SELECT id, code, full_code, name FROM region_node '
+                    'WHERE group_id = ? AND level = ? AND parent_id = ? ORDER BY position',
+                    (group_id, level, parent_id)
+                ).fetchall()
+                return [{'id': r['id'], 'code': r['code'], 'fullCode': r['full_code'], 'name': r['name']} for r in rows]
+        
+        children = self._fetch_from_api(group_id, level, parent_id)
+        nodes = [{
+            'id': c['id'],
+            'code': c.get('code'),
+            'fullCode': c.get('fullCode'),
+            'name': c.get('name')
+        } for c in children]
+        
+        with self._write_lock, conn:
+            conn.execute(
+                'DELETE FROM region_node WHERE group_id = ? AND level = ? AND parent_id = ?',
+                (group_id, level, parent_id)
+            )
+            conn.executemany(
+                'INSERT INTO region_node (group_id, level, parent_id, position, id, code, full_code, name) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(group_id, level, parent_id, i, n['id'], n['code'], n['fullCode'], n['name']) for i, n in enumerate(nodes)]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO region_fetched (group_id, level, parent_id, fetched_at) VALUES (?, ?, ?, ?)',
+                (group_id, level, parent_id, datetime.now().isoformat())
+            )
+        return nodes
+    
+    def invalidate_subtree(self, group_id: str, level: int, parent_id: str) -> int:
+        """
+        Drop cached children of a node and everything below it, so the next
+        walk refetches only that subtree. Returns number of nodes dropped.
+        """
+        dropped = 0
+        parents = [parent_id or '']
+        
+        with self._write_lock, self._connect() as conn:
+            while parents and level in self.LEVEL_FETCHERS:
+                placeholders = ','.join('?' * len(parents))
+                params = (group_id, level, *parents)
+                # Level 2 children are keyed by provinsi fullCode, deeper levels by id
+                key = 'full_code' if level == 1 else 'id'
+                children = [r[0] for r in conn.execute(
+                    f'SELECT {key} FROM region_node WHERE group_id = ? AND level = ? AND parent_id IN ({placeholders})',
+                    params
+                ).fetchall()]
+                conn.execute(f'DELETE FROM region_node WHERE group_id = ? AND level = ? AND parent_id IN ({placeholders})', params)
+                conn.execute(f'DELETE FROM region_fetched WHERE group_id = ? AND level = ? AND parent_id IN ({placeholders})', params)
+                dropped += len(children)
+                parents = children
+                level += 1
+        
+        return dropped
+    
+    # ============ WILAYAH (SMALLCODE LIST) CACHE ============
+    
+    def save_wilayah(self, group_id: str, kab_id: str, smallcodes: list,
+                     survey_id: str = None, period_id: str = None) -> int:
+        """Replace cached smallcode list of a kabupaten. Returns count saved"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute('DELETE FROM wilayah_smallcode WHERE group_id = ? AND kab_id = ?', (group_id, kab_id))
+            conn.executemany(
+                'INSERT INTO wilayah_smallcode (group_id, kab_id, position, smallcode, kecamatan, desa, sls) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(group_id, kab_id, i, item['smallcode'], item.get('kecamatan'), item.get('desa'), item.get('sls'))
+                 for i, item in enumerate(smallcodes)]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO wilayah_cache (group_id, kab_id, count, survey_id, period_id, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (group_id, kab_id, len(smallcodes), survey_id, period_id, datetime.now().isoformat())
+            )
+        return len(smallcodes)
+    
+    def get_wilayah_info(self, group_id: str, kab_id: str) -> dict:
+        """Get cache header (count, origin, fetched_at) without reading smallcodes, or None"""
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT group_id, kab_id, count, survey_id, period_id, fetched_at FROM wilayah_cache '
+            'WHERE group_id = ? AND kab_id = ?',
+            (group_id, kab_id)
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            'groupId': row['group_id'],
+            'kabId': row['kab_id'],
+            'count': row['count'],
+            'surveyId': row['survey_id'],
+            'periodId': row['period_id'],
+            'fetchedAt': row['fetched_at']
+        }
+    
+    def load_wilayah(self, group_id: str, kab_id: str, kecamatan: str = None) -> list:
+        """Load cached smallcodes in crawl order, optionally only one kecamatan"""
+        query = ('SELECT smallcode, kecamatan, desa, sls FROM wilayah_smallcode '
+                 'WHERE group_id = ? AND kab_id = ?')
+        params = [group_id, kab_id]
+        if kecamatan:
+            query += ' AND kecamatan = ?'
+            params.append(kecamatan)
+        query += ' ORDER BY position'
+        
+        conn = self._connect()
+        rows = conn.execute(query, params).fetchall()
+        return [dict(r) for r in rows]
+    
+    # ============ API-COMPATIBLE SHORTCUTS ============
+    
+    def get_provinsi(self, group_id: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 1, '', refresh)
+    
+    def get_kabupaten(self, group_id: str, prov_fullcode: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 2, prov_fullcode, refresh)
+    
+    def get_kecamatan(self, group_id: str, kab_id: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 3, kab_id, refresh)
+    
+    def get_desa(self, group_id: str, kec_id: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 4, kec_id, refresh)
+    
+    def get_sls(self, group_id: str, desa_id: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 5, desa_id, refresh)
+    
+    def get_subsls(self, group_id: str, sls_id: str, refresh: bool = False) -> list:
+        return self.get_children(group_id, 6, sls_id, refresh)
+
+
+# Global instance
+region_store = RegionStore()
@@ -0,0 +1,24 @@
+from region_store import region_store
+from fetch_engine import bounded_map
+
+
+# Deepest region level (sub-SLS)
+MAX_LEVEL = 6
+
+
+def walk_region_tree(group_id: str, kab_id: str, depth: int, max_workers: int = None) -> list:
+    """
+    Walk the region tree below a kabupaten level by level (BFS).
+    Children of every node in a level are fetched concurrently, through the
+    region store so already-known subtrees cost no API calls. Returns one
+    path per leaf (list of nodes from kecamatan down to the leaf), in the
+    same order a depth-first walk would produce.
+    """
+    depth = max(3, min(depth, MAX_LEVEL))
+    frontier = [[kec] for kec in region_store.get_kecamatan(group_id, kab_id)]
+    
+    for level in range(4, depth + 1):
+        children = bounded_map(lambda path: region_store.get_children(group_id, level, path[-1]['id']), frontier, max_workers)
+        frontier = [path + [child] for path, kids in zip(frontier, children) for child in kids]
+    
+    return frontier
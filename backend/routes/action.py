@@ -1,20 +1,49 @@
 import os
 import json
 import re
-import threading
+import time
+from contextlib import closing
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 import pandas as pd
 from api_client import api_client
 from selenium_manager import selenium_manager
 from session_manager import session_manager
 from utils import extract_answers, parse_assignment_status, get_status_keberadaan
+from fetch_engine import bounded_map, prefetch
+from action_executor import get_action_executor
+from browser_pool import browser_pool
+from assignment_store import assignment_store, history_marker
+from checkpoint import DownloadCheckpoint, list_checkpoints
+from action_plan import ActionPlan, list_plans
+from action_ledger import action_ledger, LEDGER_COLUMNS
+from task_executor import task_executor, TaskCancelled, PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND
+from progress_store import ProgressStore, FINISHED_STATUSES, ACTIVE_STATUSES
+from exporter import OUTPUT_FORMATS, get_format, write_rows, write_dataframe, read_columns, read_table
+from region_tree import walk_region_tree
+from region_store import region_store
+from routes.wilayah import get_wilayah_info
 from config import Config
 
 action_bp = Blueprint('action', __name__)
 
-# Store for task progress
-task_progress = {}
+# Store for task progress (bounded log buffers, finished tasks expire)
+task_progress = ProgressStore()
+
+
+def queue_task(fn, *args, priority: int = PRIORITY_BATCH, task_id: str = None, **progress) -> str:
+    """Register a queued task in task_progress and hand fn(task_id, *args) to the task executor"""
+    task_id = task_id or task_executor.new_task_id()
+    task_progress[task_id] = {
+        'status': 'queued',
+        'progress': 0,
+        'message': 'Waiting in queue...',
+        'filename': None,
+        'logs': [],
+        **progress
+    }
+    task_executor.submit(task_id, fn, *args, priority=priority)
+    return task_id
 
 
 def smart_sort_columns(columns: list) -> list:
@@ -51,52 +80,114 @@ def smart_sort_columns(columns: list) -> list:
 
 def get_all_smallcodes(group_id: str, kab_id: str, level_region: list) -> list:
     """Get all smallcodes for a kabupaten"""
-    smallcodes = []
+    paths = walk_region_tree(group_id, kab_id, len(level_region))
+    return [path[-1]['fullCode'] for path in paths]
+
+
+def load_cached_wilayah(survey_id: str, period_id: str, kab_id: str, group_id: str = None) -> list:
+    """Load smallcodes from cached wilayah data"""
+    info = get_wilayah_info(kab_id, group_id, survey_id, period_id)
     
-    kecamatan_list = api_client.get_kecamatan(group_id, kab_id)
+    if info:
+        return [item['smallcode'] for item in region_store.load_wilayah(info['groupId'], kab_id)]
     
-    for kec in kecamatan_list:
-        if len(level_region) == 3:
-            smallcodes.append(kec['fullCode'])
-            continue
-            
-        desa_list = api_client.get_desa(group_id, kec['id'])
-        
-        for desa in desa_list:
-            if len(level_region) == 4:
-                smallcodes.append(desa['fullCode'])
-                continue
-                
-            sls_list = api_client.get_sls(group_id, desa['id'])
-            
-            for sls in sls_list:
-                if len(level_region) == 5:
-                    smallcodes.append(sls['fullCode'])
-                    continue
-                    
-                subsls_list = api_client.get_subsls(group_id, sls['id'])
-                for subsls in subsls_list:
-                    smallcodes.append(subsls['fullCode'])
+    return None
+
+
+def load_smallcodes(task_id: str, survey_id: str, period_id: str, group_id: str, kab_id: str) -> list:
+    """Smallcodes of a kabupaten from the wilayah cache, or walked from the API"""
+    smallcodes = load_cached_wilayah(survey_id, period_id, kab_id, group_id)
+    
+    if smallcodes:
+        task_progress[task_id]['logs'].append('📁 Using cached wilayah data')
+        return smallcodes
     
-    return smallcodes
+    # Fallback: fetch from API
+    task_progress[task_id]['message'] = 'Fetching smallcodes from API...'
+    metadata = region_store.get_metadata(group_id)
+    level_region = metadata.get('data', {}).get('level', [])
+    return get_all_smallcodes(group_id, kab_id, level_region)
+
+
+def get_review_url(assignment_id: str, template_id: str, period_id: str) -> str:
+    return f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{period_id}/a/1'
 
 
-def load_cached_wilayah(survey_id: str, period_id: str, kab_id: str) -> list:
-    """Load smallcodes from cached wilayah file"""
-    filename = f"wilayah_{survey_id}_{period_id}_{kab_id}.json"
-    filepath = os.path.join(Config.WILAYAH_DIR, filename)
+def is_auth_error(error: Exception) -> bool:
+    """Check if an API error means the session is no longer authenticated"""
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in (401, 403)
+
+
+def iter_assignment_jobs(period_id: str, smallcodes: list):
+    """
+    Yield ('assignment', smallcode, assign) for every assignment, followed by a
+    ('done', smallcode, count) marker once a smallcode's assignments are queued.
+    Assignment lists are fetched concurrently, in smallcode order.
+    """
+    def list_assignments(smallcode):
+        return smallcode, api_client.get_assignments_by_smallcode(period_id, smallcode)
     
-    if os.path.exists(filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return [item['smallcode'] for item in data.get('smallcodes', [])]
+    for smallcode, assignments in bounded_map(list_assignments, smallcodes):
+        assignments = assignments or []
+        for assign in assignments:
+            yield 'assignment', smallcode, assign
+        yield 'done', smallcode, len(assignments)
+
+
+def build_assignment_row(assign: dict, smallcode: str, template_id: str, period_id: str,
+                         incremental: bool = False, keys: set = None) -> tuple:
+    """
+    Fetch status and answers of one assignment and build its raw data row.
+    With incremental=True, answers stored from a previous run are reused when
+    the assignment history has not moved since. If keys is given, only those
+    dataKeys are extracted. Returns (row, reused).
+    """
+    assignment_id = assign['assignmentId']
+    review_url = get_review_url(assignment_id, template_id, period_id)
     
-    return None
+    # Get status
+    history = api_client.get_assignment_history(assignment_id)
+    status_list = parse_assignment_status(history)
+    status_assignment = status_list[-1]['status_assignment'] if status_list else 'Open'
+    marker = history_marker(status_list)
+    
+    answer_values = assignment_store.get(period_id, assignment_id, marker) if incremental else None
+    reused = answer_values is not None
+    
+    if not reused:
+        detail = api_client.get_assignment_detail(assignment_id)
+        inner_json = json.loads(detail['data']['data'])
+        answers = inner_json.get('answers', [])
+        # Incremental runs keep full answers in the store, so projection happens after
+        answer_values = extract_answers(answers, None if incremental else keys)
+        if incremental or keys is None:
+            # Full extractions refresh the store, so any run seeds the next incremental one
+            assignment_store.put(period_id, assignment_id, marker, status_assignment, answer_values)
+    
+    if keys is not None and incremental:
+        answer_values = {k: v for k, v in answer_values.items() if k in keys}
+    
+    answer_values['assignment_id'] = assignment_id
+    answer_values['link_preview'] = review_url
+    answer_values['status_assignment'] = status_assignment
+    answer_values['smallcode'] = smallcode
+    
+    return answer_values, reused
 
 
 def download_raw_data_task(task_id: str, survey_id: str, period_id: str, template_id: str, 
-                           group_id: str, kab_id: str, kab_name: str, survey_name: str, period_name: str):
-    """Background task for downloading raw data"""
+                           group_id: str, kab_id: str, kab_name: str, survey_name: str, period_name: str,
+                           output_format: str = 'xlsx', selected_columns: list = None, resume: bool = False,
+                           incremental: bool = False):
+    """
+    Background task for downloading raw data (output_format: xlsx, csv or parquet).
+    Progress is checkpointed per smallcode; with resume=True the task continues
+    from the checkpoint of the same task_id instead of starting over.
+    With incremental=True only assignments whose history moved are refetched.
+    """
+    checkpoint = DownloadCheckpoint(task_id)
+    
     try:
         task_progress[task_id] = {
             'status': 'running',
@@ -104,104 +195,131 @@ def download_raw_data_task(task_id: str, survey_id: str, period_id: str, templat
             'message': 'Loading wilayah data...',
             'filename': None,
             'logs': [],
-            'total_assignments': 0
+            'total_assignments': 0,
+            'reused_count': 0,
+            'selected_columns': selected_columns or []
         }
         
-        # Try to load from cache first
-        smallcodes = load_cached_wilayah(survey_id, period_id, kab_id)
-        
-        if smallcodes:
-            task_progress[task_id]['logs'].append('📁 Using cached wilayah data')
+        if resume and checkpoint.load():
+            smallcodes = checkpoint.state['smallcodes']
+            task_progress[task_id]['total_assignments'] = checkpoint.state['total_assignments']
+            task_progress[task_id]['logs'].append(
+                f'♻️ Resuming from checkpoint: {checkpoint.state["completed"]}/{len(smallcodes)} smallcodes, '
+                f'{checkpoint.state["rows"]} records'
+            )
         else:
-            # Fallback: fetch from API
-            task_progress[task_id]['message'] = 'Fetching smallcodes from API...'
-            task_progress[task_id]['logs'].append('📍 Fetching smallcodes from kabupaten...')
+            # Try to load from cache first
+            smallcodes = load_cached_wilayah(survey_id, period_id, kab_id, group_id)
+            
+            if smallcodes:
+                task_progress[task_id]['logs'].append('📁 Using cached wilayah data')
+            else:
+                # Fallback: fetch from API
+                task_progress[task_id]['message'] = 'Fetching smallcodes from API...'
+                task_progress[task_id]['logs'].append('📍 Fetching smallcodes from kabupaten...')
+                
+                metadata = region_store.get_metadata(group_id)
+                level_region = metadata.get('data', {}).get('level', [])
+                smallcodes = get_all_smallcodes(group_id, kab_id, level_region)
             
-            metadata = api_client.get_region_metadata(group_id)
-            level_region = metadata.get('data', {}).get('level', [])
-            smallcodes = get_all_smallcodes(group_id, kab_id, level_region)
+            checkpoint.start({
+                'survey_id': survey_id,
+                'period_id': period_id,
+                'template_id': template_id,
+                'group_id': group_id,
+                'kab_id': kab_id,
+                'kab_name': kab_name,
+                'survey_name': survey_name,
+                'period_name': period_name,
+                'output_format': output_format,
+                'selected_columns': selected_columns or [],
+                'incremental': incremental
+            }, smallcodes)
         
         total = len(smallcodes)
         task_progress[task_id]['logs'].append(f'Found {total} smallcodes')
         
-        res_list = []
-        assign_list = []
+        # Rows are spooled to the checkpoint as they are parsed; only the column set stays in memory
+        spool = checkpoint.open_spool()
+        done = checkpoint.state['completed']
+        # Only extract the answers that end up in the output
+        keys = set(selected_columns) if selected_columns else None
         
-        for i, smallcode in enumerate(smallcodes):
-            task_progress[task_id]['progress'] = int((i / total) * 100)
-            task_progress[task_id]['message'] = f'Processing {smallcode}...'
-            
-            assignments = api_client.get_assignments_by_smallcode(period_id, smallcode)
-            
-            if not assignments:
-                continue
+        def fetch_job(job):
+            kind, smallcode, assign = job
+            if kind == 'done':
+                return job, None, None
+            try:
+                return job, build_assignment_row(assign, smallcode, template_id, period_id, incremental, keys), None
+            except Exception as e:
+                return job, None, e
+        
+        try:
+            # Workers fetch detail + history concurrently; results come back in
+            # input order so rows and logs stay deterministic
+            for (kind, smallcode, payload), result, error in bounded_map(fetch_job, iter_assignment_jobs(period_id, smallcodes[done:])):
+                # Stops before committing a partial smallcode, so the checkpoint stays consistent
+                task_executor.check_cancelled(task_id)
                 
-            task_progress[task_id]['total_assignments'] += len(assignments)
-            assign_list.extend(assignments)
-            
-            for assign in assignments:
-                assignment_id = assign['assignmentId']
-                review_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{period_id}/a/1'
+                if kind == 'done':
+                    done += 1
+                    task_progress[task_id]['total_assignments'] += payload
+                    checkpoint.commit(done, spool, task_progress[task_id]['total_assignments'])
+                    task_progress[task_id]['progress'] = int((done / total) * 100)
+                    task_progress[task_id]['message'] = f'Processing {smallcode}...'
+                    if payload:
+                        task_progress[task_id]['logs'].append(f'✅ {smallcode}: {payload} assignments')
+                    continue
                 
-                try:
-                    detail = api_client.get_assignment_detail(assignment_id)
-                    inner_json = json.loads(detail['data']['data'])
-                    answers = inner_json.get('answers', [])
-                    answer_values = extract_answers(answers)
-                    
-                    # Get status
-                    history = api_client.get_assignment_history(assignment_id)
-                    status_list = parse_assignment_status(history)
-                    status_assignment = status_list[-1]['status_assignment'] if status_list else 'Open'
-                    
-                    answer_values['assignment_id'] = assignment_id
-                    answer_values['link_preview'] = review_url
-                    answer_values['status_assignment'] = status_assignment
-                    answer_values['smallcode'] = smallcode
-                    
-                    res_list.append(answer_values)
-                except Exception as e:
-                    task_progress[task_id]['logs'].append(f'⚠️ Error {assignment_id}: {str(e)}')
-            
-            task_progress[task_id]['logs'].append(f'✅ {smallcode}: {len(assignments)} assignments')
-        
-        # Save to Excel
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"Raw_Data_{kab_name}_{survey_name}_{period_name}_{timestamp}.xlsx"
-        os.makedirs(Config.RAW_DATA_DIR, exist_ok=True)
-        filepath = os.path.join(Config.RAW_DATA_DIR, filename)
-        
-        if res_list:
-            df = pd.DataFrame(res_list)
+                if error is not None:
+                    if is_auth_error(error):
+                        # Stop here; the unfinished smallcode is redone on resume
+                        raise Exception(f'Session expired at {smallcode}, login again and resume task {task_id}')
+                    task_progress[task_id]['logs'].append(f'⚠️ Error {payload["assignmentId"]}: {str(error)}')
+                    continue
+                
+                row, reused = result
+                if reused:
+                    task_progress[task_id]['reused_count'] += 1
+                spool.append(row)
             
-            # Remove duplicate columns
-            df = df.loc[:, ~df.columns.duplicated()]
+            # Save to output file
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"Raw_Data_{kab_name}_{survey_name}_{period_name}_{timestamp}.{output_format}"
+            os.makedirs(Config.RAW_DATA_DIR, exist_ok=True)
+            filepath = os.path.join(Config.RAW_DATA_DIR, filename)
             
-            # Get selected columns from task_progress (set by route)
-            selected_columns = task_progress[task_id].get('selected_columns', [])
+            if incremental:
+                task_progress[task_id]['logs'].append(
+                    f'♻️ Incremental: {task_progress[task_id]["reused_count"]} assignments unchanged since last run'
+                )
             
-            if selected_columns:
-                # Filter to only selected columns that exist
-                existing_cols = [c for c in selected_columns if c in df.columns]
-                df = df[existing_cols]
+            if spool.count:
+                if selected_columns:
+                    # Filter to only selected columns that exist
+                    columns = [c for c in selected_columns if c in spool.columns]
+                else:
+                    # Sort columns with smart ordering if no selection
+                    columns = smart_sort_columns(spool.columns)
+                
+                task_progress[task_id]['message'] = f'Writing {spool.count} records...'
+                write_rows(filepath, columns, spool)
+                
+                task_progress[task_id]['status'] = 'completed'
+                task_progress[task_id]['progress'] = 100
+                task_progress[task_id]['message'] = f'Completed! {spool.count} records saved.'
+                task_progress[task_id]['filename'] = filename
+                task_progress[task_id]['columns'] = columns
+                task_progress[task_id]['logs'].append(f'📁 File saved: {filename} ({len(columns)} columns)')
             else:
-                # Sort columns with smart ordering if no selection
-                df = df.reindex(smart_sort_columns(list(df.columns)), axis=1)
-            
-            df.fillna('', inplace=True)
-            df.to_excel(filepath, index=False)
-            
-            task_progress[task_id]['status'] = 'completed'
-            task_progress[task_id]['progress'] = 100
-            task_progress[task_id]['message'] = f'Completed! {len(res_list)} records saved.'
-            task_progress[task_id]['filename'] = filename
-            task_progress[task_id]['columns'] = list(df.columns)
-            task_progress[task_id]['logs'].append(f'📁 File saved: {filename} ({len(df.columns)} columns)')
-        else:
-            task_progress[task_id]['status'] = 'completed'
-            task_progress[task_id]['progress'] = 100
-            task_progress[task_id]['message'] = 'No data found'
-            
+                task_progress[task_id]['status'] = 'completed'
+                task_progress[task_id]['progress'] = 100
+                task_progress[task_id]['message'] = 'No data found'
+        finally:
+            spool.close(delete=False)
+        
+        checkpoint.discard()
+        
         # Save session after action
         sess_data = selenium_manager.get_session_data()
         if sess_data['is_logged_in'] and sess_data['username']:
@@ -212,7 +330,214 @@ def download_raw_data_task(task_id: str, survey_id: str, period_id: str, templat
                 headers=sess_data['headers']
             )
             task_progress[task_id]['logs'].append('✅ Session updated')
+    
+    except TaskCancelled:
+        task_progress[task_id]['status'] = 'cancelled'
+        task_progress[task_id]['message'] = 'Cancelled'
+        task_progress[task_id]['logs'].append('🛑 Cancelled')
+        if checkpoint.exists():
+            task_progress[task_id]['resumable'] = True
+            task_progress[task_id]['logs'].append(f'💾 Checkpoint kept, task can be resumed: {task_id}')
+    except Exception as e:
+        task_progress[task_id]['status'] = 'error'
+        task_progress[task_id]['message'] = str(e)
+        task_progress[task_id]['logs'].append(f'❌ Error: {str(e)}')
+        if checkpoint.exists():
+            task_progress[task_id]['resumable'] = True
+            task_progress[task_id]['logs'].append(f'💾 Checkpoint kept, task can be resumed: {task_id}')
+
+
+# Status conditions for each role and action
+# Refactored from fasih_sm_scrape - v6 (1).py
+STATUS_CONDITIONS = {
+    'approve': {
+        'Pengawas': ['SUBMITTED BY Pencacah'],
+        'PML': ['SUBMITTED BY PPL'],
+        'Admin Kabupaten': ['APPROVED BY Pengawas', 'APPROVED BY PML', 'EDITED BY Admin Kabupaten'],
+        'Admin Provinsi': ['COMPLETED BY Admin Kabupaten']
+    },
+    'revoke': {
+        'Pengawas': ['COMPLETED BY Pengawas'],
+        # Original script has condition: roles == 'Pengawas' and status_assignment == 'COMPLETED BY Pengawas' and status_keberadaan == '3. Tidak Ditemukan'
+        # For revoke purposes, current implementation allows Admin Kabupaten too if needed, but we follow original strictly
+    },
+    'reject': {
+        'Pengawas': ['SUBMITTED BY Pencacah'],
+        # Original script: roles == 'Pengawas' and status_assignment == 'SUBMITTED BY Pencacah' and status_keberadaan == '3. Tidak Ditemukan'
+    }
+}
+
+# Explicitly defined statuses that mean it's ALREADY processed for a role
+# This helps in skipping "Approve by Admin" or higher
+SKIP_WORDS = ['APPROVED', 'COMPLETED', 'REJECTED', 'REVOKED']
+
+
+def check_eligibility(assign: dict, smallcode: str, action_type: str, role: str,
+                      allowed_statuses: list, template_id: str, period_id: str) -> dict:
+    """
+    Fetch current status (and keberadaan for revoke/reject) of one assignment
+    and decide whether the action applies to it.
+    Returns { assignment_id, smallcode, review_url, status, eligible, reason }
+    """
+    assignment_id = assign['assignmentId']
+    review_url = get_review_url(assignment_id, template_id, period_id)
+    check = {
+        'assignment_id': assignment_id,
+        'smallcode': smallcode,
+        'review_url': review_url,
+        'status': None,
+        'eligible': False,
+        'reason': None
+    }
+    
+    # Get current status
+    history = api_client.get_assignment_history(assignment_id)
+    status_list = parse_assignment_status(history)
+    current_status = status_list[-1]['status_assignment'] if status_list else 'Open'
+    check['status'] = current_status
+    check['marker'] = history_marker(status_list)
+    
+    # Check if status allows action
+    if current_status not in allowed_statuses:
+        # Extra check: if it's already "APPROVED" or similar, we skip it clearly
+        is_already_processed = any(word in current_status.upper() for word in SKIP_WORDS)
+        check['reason'] = "already processed" if is_already_processed else f"status not eligible: {current_status}"
+        return check
+    
+    # Special condition from original script: status_keberadaan check for revoke/reject
+    if action_type in ['revoke', 'reject']:
+        detail = api_client.get_assignment_detail(assignment_id)
+        status_keberadaan = get_status_keberadaan(detail)
+        # Original script specifically checks for '3. Tidak Ditemukan' for revoke/reject by Pengawas
+        if role == 'Pengawas' and status_keberadaan != '3. Tidak Ditemukan':
+            check['reason'] = f'status_keberadaan: {status_keberadaan}'
+            return check
+    
+    check['eligible'] = True
+    return check
+
+
+def revalidate_planned(assign: dict, smallcode: str, allowed_statuses: list,
+                       template_id: str, period_id: str) -> dict:
+    """
+    Cheap re-check of a planned assignment right before acting: history only.
+    Still eligible if the status has not moved since the plan snapshot.
+    """
+    assignment_id = assign['assignmentId']
+    history = api_client.get_assignment_history(assignment_id)
+    status_list = parse_assignment_status(history)
+    current_status = status_list[-1]['status_assignment'] if status_list else 'Open'
+    eligible = current_status == assign['plannedStatus'] and current_status in allowed_statuses
+    
+    return {
+        'assignment_id': assignment_id,
+        'smallcode': smallcode,
+        'review_url': get_review_url(assignment_id, template_id, period_id),
+        'status': current_status,
+        'marker': history_marker(status_list),
+        'eligible': eligible,
+        'reason': None if eligible else f'status changed since plan: {current_status}'
+    }
+
+
+def iter_plan_jobs(items: list):
+    """Same job stream as iter_assignment_jobs, built from planned items instead of the API"""
+    i = 0
+    while i < len(items):
+        smallcode = items[i]['smallcode']
+        count = 0
+        while i < len(items) and items[i]['smallcode'] == smallcode:
+            yield 'assignment', smallcode, {'assignmentId': items[i]['assignment_id'], 'plannedStatus': items[i]['status']}
+            count += 1
+            i += 1
+        yield 'done', smallcode, count
+
+
+def plan_task(task_id: str, survey_id: str, period_id: str, template_id: str,
+              group_id: str, kab_id: str, kab_name: str, survey_name: str, period_name: str,
+              action_type: str = 'approve'):
+    """
+    Background task for a dry run of approve/revoke/reject: runs the eligibility
+    checks concurrently without touching the browser and saves the result as a plan
+    (plan id = task id).
+    """
+    try:
+        task_progress[task_id] = {
+            'status': 'running',
+            'progress': 0,
+            'message': 'Getting user role...',
+            'filename': None,
+            'logs': [],
+            'plan_id': None,
+            'eligible_count': 0,
+            'fail_count': 0,
+            'skip_count': 0,
+            'total_assignments': 0
+        }
+        
+        role = api_client.get_user_role(period_id)
+        task_progress[task_id]['logs'].append(f'👤 Role: {role}')
+        
+        smallcodes = load_smallcodes(task_id, survey_id, period_id, group_id, kab_id)
+        total = len(smallcodes)
+        allowed_statuses = STATUS_CONDITIONS.get(action_type, {}).get(role, [])
+        
+        def check_job(job):
+            kind, smallcode, assign = job
+            if kind == 'done' or task_executor.is_cancelled(task_id):
+                return job, None, None
+            try:
+                return job, check_eligibility(assign, smallcode, action_type, role, allowed_statuses, template_id, period_id), None
+            except Exception as e:
+                return job, None, e
+        
+        items = []
+        done = 0
+        for (kind, smallcode, payload), check, error in bounded_map(check_job, iter_assignment_jobs(period_id, smallcodes)):
+            task_executor.check_cancelled(task_id)
             
+            if kind == 'done':
+                done += 1
+                task_progress[task_id]['total_assignments'] += payload
+                task_progress[task_id]['progress'] = int((done / total) * 100)
+                task_progress[task_id]['message'] = f'Checking {smallcode}...'
+                continue
+            
+            if error is not None:
+                task_progress[task_id]['fail_count'] += 1
+                task_progress[task_id]['logs'].append(f'⚠️ Error {payload["assignmentId"]}: {str(error)}')
+                continue
+            
+            items.append(check)
+            if check['eligible']:
+                task_progress[task_id]['eligible_count'] += 1
+            else:
+                task_progress[task_id]['skip_count'] += 1
+        
+        plan = ActionPlan(task_id)
+        plan.save({
+            'survey_id': survey_id,
+            'period_id': period_id,
+            'template_id': template_id,
+            'group_id': group_id,
+            'kab_id': kab_id,
+            'kab_name': kab_name,
+            'survey_name': survey_name,
+            'period_name': period_name,
+            'action_type': action_type
+        }, role, items)
+        
+        eligible = plan.state['eligible']
+        task_progress[task_id]['status'] = 'completed'
+        task_progress[task_id]['progress'] = 100
+        task_progress[task_id]['plan_id'] = task_id
+        task_progress[task_id]['message'] = f'Plan ready: {eligible} of {len(items)} assignments eligible for {action_type}'
+        task_progress[task_id]['logs'].append(f'📋 Plan saved: {task_id}')
+    
+    except TaskCancelled:
+        task_progress[task_id]['status'] = 'cancelled'
+        task_progress[task_id]['message'] = 'Cancelled, no plan saved'
+        task_progress[task_id]['logs'].append('🛑 Cancelled')
     except Exception as e:
         task_progress[task_id]['status'] = 'error'
         task_progress[task_id]['message'] = str(e)
@@ -221,8 +546,14 @@ def download_raw_data_task(task_id: str, survey_id: str, period_id: str, templat
 
 def approve_task(task_id: str, survey_id: str, period_id: str, template_id: str,
                  group_id: str, kab_id: str, kab_name: str, survey_name: str, period_name: str,
-                 action_type: str = 'approve'):
-    """Background task for approve/revoke/reject"""
+                 action_type: str = 'approve', output_format: str = 'xlsx', executor_mode: str = None,
+                 plan_id: str = None):
+    """
+    Background task for approve/revoke/reject (log written as output_format).
+    executor_mode selects how actions are sent: 'http', 'selenium' or 'auto'.
+    With plan_id only the eligible assignments of that plan are acted on,
+    each after a history re-check instead of the full eligibility run.
+    """
     try:
         task_progress[task_id] = {
             'status': 'running',
@@ -236,174 +567,192 @@ def approve_task(task_id: str, survey_id: str, period_id: str, template_id: str,
             'total_assignments': 0
         }
         
-        # Get role
-        role = api_client.get_user_role(period_id)
-        task_progress[task_id]['logs'].append(f'👤 Role: {role}')
-        
-        # Try to load from cache first
-        smallcodes = load_cached_wilayah(survey_id, period_id, kab_id)
+        plan = ActionPlan(plan_id) if plan_id else None
+        if plan and not plan.load():
+            raise Exception(f'Plan not found: {plan_id}')
         
-        if smallcodes:
-            task_progress[task_id]['logs'].append('📁 Using cached wilayah data')
+        if plan:
+            role = plan.state['role']
+            planned = plan.eligible_items()
+            smallcodes = list(dict.fromkeys(item['smallcode'] for item in planned))
+            task_progress[task_id]['logs'].append(f'👤 Role: {role}')
+            task_progress[task_id]['logs'].append(f'📋 Executing plan {plan_id}: {len(planned)} planned assignments')
         else:
-            # Fallback: fetch from API
-            task_progress[task_id]['message'] = 'Fetching smallcodes from API...'
-            metadata = api_client.get_region_metadata(group_id)
-            level_region = metadata.get('data', {}).get('level', [])
-            smallcodes = get_all_smallcodes(group_id, kab_id, level_region)
+            # Get role
+            role = api_client.get_user_role(period_id)
+            task_progress[task_id]['logs'].append(f'👤 Role: {role}')
+            smallcodes = load_smallcodes(task_id, survey_id, period_id, group_id, kab_id)
         
         total = len(smallcodes)
         
-        log_data = []
-        button_map = {
-            'approve': 'buttonApprove',
-            'revoke': 'buttonRevoke',
-            'reject': 'buttonReject'
-        }
-        button_id = button_map.get(action_type, 'buttonApprove')
-        
-        # Status conditions for each role and action
-        # Refactored from fasih_sm_scrape - v6 (1).py
-        status_conditions = {
-            'approve': {
-                'Pengawas': ['SUBMITTED BY Pencacah'],
-                'PML': ['SUBMITTED BY PPL'],
-                'Admin Kabupaten': ['APPROVED BY Pengawas', 'APPROVED BY PML', 'EDITED BY Admin Kabupaten'],
-                'Admin Provinsi': ['COMPLETED BY Admin Kabupaten']
-            },
-            'revoke': {
-                'Pengawas': ['COMPLETED BY Pengawas'],
-                # Original script has condition: roles == 'Pengawas' and status_assignment == 'COMPLETED BY Pengawas' and status_keberadaan == '3. Tidak Ditemukan'
-                # For revoke purposes, current implementation allows Admin Kabupaten too if needed, but we follow original strictly
-            },
-            'reject': {
-                'Pengawas': ['SUBMITTED BY Pencacah'],
-                # Original script: roles == 'Pengawas' and status_assignment == 'SUBMITTED BY Pencacah' and status_keberadaan == '3. Tidak Ditemukan'
-            }
-        }
+        # Every outcome goes to the ledger as it happens; the log file is built from it
+        username = session_manager.username
+        
+        def log_entry(entry, check=None):
+            action_ledger.record(task_id, period_id, {
+                **entry,
+                'role': role,
+                'username': username,
+                'marker': check.get('marker') if check else None
+            })
+        
+        # Earlier successes of this role and user are only a hint: the history check still runs
+        already_done = action_ledger.succeeded(period_id, action_type, role, username)
+        if already_done:
+            task_progress[task_id]['logs'].append(
+                f'📒 Ledger: {len(already_done)} earlier successes, skipped while their history is unchanged'
+            )
         
-        allowed_statuses = status_conditions.get(action_type, {}).get(role, [])
+        # Headless browser workers start on the first Selenium action, if any
+        executor = get_action_executor(
+            executor_mode,
+            on_pool_start=lambda workers: task_progress[task_id]['logs'].append(f'🧩 Browser workers: {workers}')
+        )
+        task_progress[task_id]['logs'].append(f'⚙️ Action executor: {executor.name}')
         
-        # Explicitly defined statuses that mean it's ALREADY processed for a role
-        # This helps in skipping "Approve by Admin" or higher
-        skip_words = ['APPROVED', 'COMPLETED', 'REJECTED', 'REVOKED']
+        allowed_statuses = STATUS_CONDITIONS.get(action_type, {}).get(role, [])
         
         processed = 0
         success_count = 0
         fail_count = 0
+        done = 0
+        
+        def check_job(job):
+            kind, smallcode, assign = job
+            if kind == 'done' or task_executor.is_cancelled(task_id):
+                return job, None, None
+            try:
+                if plan:
+                    check = revalidate_planned(assign, smallcode, allowed_statuses, template_id, period_id)
+                else:
+                    check = check_eligibility(assign, smallcode, action_type, role, allowed_statuses, template_id, period_id)
+            except Exception as e:
+                return job, None, e
+            # Same status and no newer history entry since our recorded success:
+            # the transition has not shown up yet, acting again would double it
+            if check['eligible'] and already_done.get(check['assignment_id']) == (check['status'], check['marker']):
+                check['eligible'] = False
+                check['reason'] = f'{action_type} already succeeded in an earlier run'
+            return job, check, None
+        
+        def run_action(entry):
+            job, check, error = entry
+            if error is not None or check is None or not check['eligible']:
+                return job, check, None, error
+            if task_executor.is_cancelled(task_id):
+                return job, check, {'success': False, 'cancelled': True}, None
+            try:
+                return job, check, executor.execute(
+                    action_type, check['assignment_id'], check['review_url'], period_id, template_id, check['status']
+                ), None
+            except Exception as e:
+                return job, check, None, e
         
-        for i, smallcode in enumerate(smallcodes):
-            task_progress[task_id]['progress'] = int((i / total) * 100)
-            task_progress[task_id]['message'] = f'Processing {smallcode}...'
+        def until_cancelled(jobs):
+            for job in jobs:
+                if task_executor.is_cancelled(task_id):
+                    return
+                yield job
+        
+        # Producer stage: assignment lists, history/detail and eligibility rules run
+        # concurrently on a background thread and fill a bounded queue.
+        # Action stage: drains the queue, executor.concurrency actions at a time
+        # (ACTION_HTTP_WORKERS for HTTP, one per browser worker for Selenium).
+        # Both stages keep input order, so the log matches the sequential run.
+        # On cancel no new list fetch, check or action starts, but the queue is still
+        # drained so every outcome that did happen reaches the ledger and the log.
+        jobs = iter_plan_jobs(planned) if plan else iter_assignment_jobs(period_id, smallcodes)
+        checked = prefetch(bounded_map(check_job, until_cancelled(jobs)), Config.ACTION_QUEUE_SIZE)
+        
+        with closing(bounded_map(run_action, checked, executor.concurrency)) as outcomes:
+            for (kind, smallcode, payload), check, result, error in outcomes:
+                if kind == 'done':
+                    done += 1
+                    task_progress[task_id]['total_assignments'] += payload
+                    task_progress[task_id]['progress'] = int((done / total) * 100)
+                    task_progress[task_id]['message'] = f'Processing {smallcode}...'
+                    continue
             
-            assignments = api_client.get_assignments_by_smallcode(period_id, smallcode)
+                if error is not None:
+                    fail_count += 1
+                    task_progress[task_id]['fail_count'] = fail_count
+                    log_entry({
+                        'assignment_id': payload['assignmentId'],
+                        'smallcode': smallcode,
+                        'status': 'ERROR',
+                        'action': action_type,
+                        'result': 'error',
+                        'message': str(error)
+                    })
+                    continue
             
-            if not assignments:
-                continue
+                # Cancelled before its check or its action started: nothing to record
+                if check is None or (result is not None and result.get('cancelled')):
+                    continue
             
-            task_progress[task_id]['total_assignments'] += len(assignments)
+                assignment_id = check['assignment_id']
+                current_status = check['status']
             
-            for assign in assignments:
-                assignment_id = assign['assignmentId']
-                review_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{period_id}/a/1'
-                
-                try:
-                    # Get current status
-                    history = api_client.get_assignment_history(assignment_id)
-                    status_list = parse_assignment_status(history)
-                    current_status = status_list[-1]['status_assignment'] if status_list else 'Open'
-                    
-                    # Log message for debug
-                    status_upper = current_status.upper()
-                    
-                    # Check if status allows action
-                    if current_status not in allowed_statuses:
-                        # Extra check: if it's already "APPROVED" or similar, we skip it clearly
-                        is_already_processed = any(word in status_upper for word in skip_words)
-                        reason = "already processed" if is_already_processed else f"status not eligible: {current_status}"
-                        
-                        log_data.append({
-                            'assignment_id': assignment_id,
-                            'smallcode': smallcode,
-                            'status': current_status,
-                            'action': action_type,
-                            'result': 'skipped',
-                            'message': f'Skipped ({reason})'
-                        })
-                        task_progress[task_id]['skip_count'] += 1
-                        continue
-
-                    # Special condition from original script: status_keberadaan check for revoke/reject
-                    if action_type in ['revoke', 'reject']:
-                        detail = api_client.get_assignment_detail(assignment_id)
-                        status_keberadaan = get_status_keberadaan(detail)
-                        # Original script specifically checks for '3. Tidak Ditemukan' for revoke/reject by Pengawas
-                        if role == 'Pengawas' and status_keberadaan != '3. Tidak Ditemukan':
-                            log_data.append({
-                                'assignment_id': assignment_id,
-                                'smallcode': smallcode,
-                                'status': current_status,
-                                'action': action_type,
-                                'result': 'skipped',
-                                'message': f'Skipped (status_keberadaan: {status_keberadaan})'
-                            })
-                            task_progress[task_id]['skip_count'] += 1
-                            continue
-                    
-                    # Perform action using Selenium
-                    result = selenium_manager.navigate_and_click(review_url, button_id)
-                    
-                    if result['success']:
-                        success_count += 1
-                        task_progress[task_id]['success_count'] = success_count
-                        log_data.append({
-                            'assignment_id': assignment_id,
-                            'smallcode': smallcode,
-                            'status': current_status,
-                            'action': action_type,
-                            'result': 'success',
-                            'message': result['message']
-                        })
-                        task_progress[task_id]['logs'].append(f'✅ {assignment_id}: {action_type} success')
-                    else:
-                        fail_count += 1
-                        task_progress[task_id]['fail_count'] = fail_count
-                        log_data.append({
-                            'assignment_id': assignment_id,
-                            'smallcode': smallcode,
-                            'status': current_status,
-                            'action': action_type,
-                            'result': 'failed',
-                            'message': result['message']
-                        })
-                        task_progress[task_id]['logs'].append(f'❌ {assignment_id}: {result["message"]}')
-                    
-                    processed += 1
-                    
-                except Exception as e:
+                if not check['eligible']:
+                    log_entry({
+                        'assignment_id': assignment_id,
+                        'smallcode': smallcode,
+                        'status': current_status,
+                        'action': action_type,
+                        'result': 'skipped',
+                        'message': f'Skipped ({check["reason"]})'
+                    }, check)
+                    task_progress[task_id]['skip_count'] += 1
+                    continue
+            
+                if result['success']:
+                    success_count += 1
+                    task_progress[task_id]['success_count'] = success_count
+                    log_entry({
+                        'assignment_id': assignment_id,
+                        'smallcode': smallcode,
+                        'status': current_status,
+                        'action': action_type,
+                        'result': 'success',
+                        'message': result['message'],
+                        'executor': result.get('executor')
+                    }, check)
+                    task_progress[task_id]['logs'].append(f'✅ {assignment_id}: {action_type} success')
+                else:
                     fail_count += 1
                     task_progress[task_id]['fail_count'] = fail_count
-                    log_data.append({
+                    log_entry({
                         'assignment_id': assignment_id,
                         'smallcode': smallcode,
-                        'status': 'ERROR',
+                        'status': current_status,
                         'action': action_type,
-                        'result': 'error',
-                        'message': str(e)
-                    })
+                        'result': 'failed',
+                        'message': result['message'],
+                        'executor': result.get('executor')
+                    }, check)
+                    task_progress[task_id]['logs'].append(f'❌ {assignment_id}: {result["message"]}')
+            
+                processed += 1
         
-        # Save log to Excel
+        # Save log file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"Log_{action_type.title()}_{kab_name}_{survey_name}_{period_name}_{timestamp}.xlsx"
+        filename = f"Log_{action_type.title()}_{kab_name}_{survey_name}_{period_name}_{timestamp}.{output_format}"
         filepath = os.path.join(Config.LOG_DIR, filename)
         
-        if log_data:
-            df = pd.DataFrame(log_data)
-            df.to_excel(filepath, index=False)
+        cancelled = task_executor.is_cancelled(task_id)
+        log_rows = action_ledger.get_run(task_id)
+        if log_rows:
+            df = pd.DataFrame(log_rows, columns=LEDGER_COLUMNS)
+            write_dataframe(df, filepath)
         
-        task_progress[task_id]['status'] = 'completed'
-        task_progress[task_id]['progress'] = 100
-        task_progress[task_id]['message'] = f'Done! Success: {success_count}, Failed: {fail_count}'
+        if cancelled:
+            task_progress[task_id]['status'] = 'cancelled'
+            task_progress[task_id]['message'] = f'Cancelled! Success: {success_count}, Failed: {fail_count}'
+            task_progress[task_id]['logs'].append('🛑 Cancelled')
+        else:
+            task_progress[task_id]['status'] = 'completed'
+            task_progress[task_id]['progress'] = 100
+            task_progress[task_id]['message'] = f'Done! Success: {success_count}, Failed: {fail_count}'
         task_progress[task_id]['filename'] = filename
         task_progress[task_id]['logs'].append(f'📁 Log saved: {filename}')
         
@@ -424,6 +773,52 @@ def approve_task(task_id: str, survey_id: str, period_id: str, template_id: str,
         task_progress[task_id]['logs'].append(f'❌ Error: {str(e)}')
 
 
+def launch_scheduled_job(job: dict) -> str:
+    """Queue a saved job definition (see scheduler.JobScheduler) with background priority"""
+    params = job['params']
+    region_args = (
+        params['surveyId'],
+        params['periodId'],
+        params['templateId'],
+        params['groupId'],
+        params['kabId'],
+        params['kabName'],
+        params['surveyName'],
+        params['periodName']
+    )
+    
+    if job['action'] == 'download-raw':
+        return queue_task(
+            download_raw_data_task,
+            *region_args,
+            params['format'],
+            params['selectedColumns'],
+            False,
+            params['incremental'],
+            priority=PRIORITY_BACKGROUND,
+            selected_columns=params['selectedColumns'],
+            scheduled_job=job['id']
+        )
+    
+    return queue_task(
+        approve_task,
+        *region_args,
+        job['action'],
+        params['format'],
+        params['executor'],
+        priority=PRIORITY_BACKGROUND,
+        scheduled_job=job['id']
+    )
+
+
+def is_task_active(task_id: str) -> bool:
+    """Queued or running, in this or (through the task state backend) another process"""
+    if task_executor.is_active(task_id):
+        return True
+    data = task_progress.snapshot(task_id)
+    return data is not None and data.get('status') in ACTIVE_STATUSES
+
+
 @action_bp.route('/download-raw', methods=['POST'])
 def download_raw():
     """Start raw data download task"""
@@ -434,28 +829,72 @@ def download_raw():
         if field not in data:
             return jsonify({'success': False, 'message': f'{field} required'}), 400
     
-    task_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    output_format = str(data.get('format', 'xlsx')).lower()
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'success': False, 'message': f'format must be one of: {", ".join(OUTPUT_FORMATS)}'}), 400
     
     # Store selected columns for filtering (optional)
     selected_columns = data.get('selectedColumns', [])
-    task_progress[task_id] = {'selected_columns': selected_columns}
-    
-    # Start background thread
-    thread = threading.Thread(
-        target=download_raw_data_task,
-        args=(
-            task_id,
-            data['surveyId'],
-            data['periodId'],
-            data['templateId'],
-            data['groupId'],
-            data['kabId'],
-            data['kabName'],
-            data['surveyName'],
-            data['periodName']
-        )
+    
+    task_id = queue_task(
+        download_raw_data_task,
+        data['surveyId'],
+        data['periodId'],
+        data['templateId'],
+        data['groupId'],
+        data['kabId'],
+        data['kabName'],
+        data['surveyName'],
+        data['periodName'],
+        output_format,
+        selected_columns,
+        False,
+        bool(data.get('incremental', False)),
+        priority=PRIORITY_BATCH,
+        selected_columns=selected_columns
+    )
+    
+    return jsonify({'success': True, 'taskId': task_id})
+
+
+@action_bp.route('/resumable', methods=['GET'])
+def get_resumable():
+    """List unfinished raw data downloads that can be resumed"""
+    return jsonify({
+        'success': True,
+        'tasks': list_checkpoints()
+    })
+
+
+@action_bp.route('/resume/<task_id>', methods=['POST'])
+def resume_download(task_id):
+    """Resume an interrupted raw data download from its checkpoint"""
+    state = DownloadCheckpoint(task_id).read_state()
+    if not state:
+        return jsonify({'success': False, 'message': 'Checkpoint not found'}), 404
+    
+    # Also running in another server process: two writers on one checkpoint and log
+    if is_task_active(task_id):
+        return jsonify({'success': False, 'message': 'Task is still running'}), 409
+    
+    params = state['params']
+    task_id = queue_task(
+        download_raw_data_task,
+        params['survey_id'],
+        params['period_id'],
+        params['template_id'],
+        params['group_id'],
+        params['kab_id'],
+        params['kab_name'],
+        params['survey_name'],
+        params['period_name'],
+        params['output_format'],
+        params['selected_columns'],
+        True,
+        params.get('incremental', False),
+        priority=PRIORITY_BATCH,
+        task_id=task_id
     )
-    thread.start()
     
     return jsonify({'success': True, 'taskId': task_id})
 
@@ -487,40 +926,234 @@ def _start_action_task(action_type: str):
         if field not in data:
             return jsonify({'success': False, 'message': f'{field} required'}), 400
     
-    task_id = datetime.now().strftime("%Y%m%d%H%M%S")
-    
-    thread = threading.Thread(
-        target=approve_task,
-        args=(
-            task_id,
-            data['surveyId'],
-            data['periodId'],
-            data['templateId'],
-            data['groupId'],
-            data['kabId'],
-            data['kabName'],
-            data['surveyName'],
-            data['periodName'],
-            action_type
-        )
+    output_format = str(data.get('format', 'xlsx')).lower()
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'success': False, 'message': f'format must be one of: {", ".join(OUTPUT_FORMATS)}'}), 400
+    
+    if data.get('executor') and data['executor'] not in ('auto', 'http', 'selenium'):
+        return jsonify({'success': False, 'message': 'executor must be one of: auto, http, selenium'}), 400
+    
+    task_id = queue_task(
+        approve_task,
+        data['surveyId'],
+        data['periodId'],
+        data['templateId'],
+        data['groupId'],
+        data['kabId'],
+        data['kabName'],
+        data['surveyName'],
+        data['periodName'],
+        action_type,
+        output_format,
+        data.get('executor'),
+        priority=PRIORITY_INTERACTIVE
     )
-    thread.start()
     
     return jsonify({'success': True, 'taskId': task_id})
 
 
+@action_bp.route('/plan', methods=['POST'])
+def plan():
+    """
+    Dry run of approve/revoke/reject: check eligibility only and save a plan
+    Body: { ...same as approve, actionType: 'approve' | 'revoke' | 'reject' }
+    """
+    data = request.get_json()
+    
+    required = ['surveyId', 'periodId', 'templateId', 'groupId', 'kabId', 'kabName', 'surveyName', 'periodName']
+    for field in required:
+        if field not in data:
+            return jsonify({'success': False, 'message': f'{field} required'}), 400
+    
+    action_type = data.get('actionType', 'approve')
+    if action_type not in STATUS_CONDITIONS:
+        return jsonify({'success': False, 'message': f'actionType must be one of: {", ".join(STATUS_CONDITIONS)}'}), 400
+    
+    task_id = queue_task(
+        plan_task,
+        data['surveyId'],
+        data['periodId'],
+        data['templateId'],
+        data['groupId'],
+        data['kabId'],
+        data['kabName'],
+        data['surveyName'],
+        data['periodName'],
+        action_type,
+        priority=PRIORITY_INTERACTIVE
+    )
+    
+    return jsonify({'success': True, 'taskId': task_id, 'planId': task_id})
+
+
+@action_bp.route('/plans', methods=['GET'])
+def get_plans():
+    """List saved action plans"""
+    return jsonify({'success': True, 'data': list_plans()})
+
+
+@action_bp.route('/plan/<plan_id>', methods=['GET'])
+def get_plan(plan_id):
+    """Get a saved plan with its items"""
+    state = ActionPlan(plan_id).load()
+    if not state:
+        return jsonify({'success': False, 'message': 'Plan not found'}), 404
+    
+    return jsonify({'success': True, 'data': state})
+
+
+@action_bp.route('/plan/<plan_id>/execute', methods=['POST'])
+def execute_plan(plan_id):
+    """
+    Act on the eligible assignments of a saved plan
+    Body: { format?: str, executor?: str }
+    """
+    state = ActionPlan(plan_id).load()
+    if not state:
+        return jsonify({'success': False, 'message': 'Plan not found'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    
+    output_format = str(data.get('format', 'xlsx')).lower()
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'success': False, 'message': f'format must be one of: {", ".join(OUTPUT_FORMATS)}'}), 400
+    
+    if data.get('executor') and data['executor'] not in ('auto', 'http', 'selenium'):
+        return jsonify({'success': False, 'message': 'executor must be one of: auto, http, selenium'}), 400
+    
+    params = state['params']
+    task_id = queue_task(
+        approve_task,
+        params['survey_id'],
+        params['period_id'],
+        params['template_id'],
+        params['group_id'],
+        params['kab_id'],
+        params['kab_name'],
+        params['survey_name'],
+        params['period_name'],
+        params['action_type'],
+        output_format,
+        data.get('executor'),
+        plan_id,
+        priority=PRIORITY_INTERACTIVE
+    )
+    
+    return jsonify({'success': True, 'taskId': task_id})
+
+
+@action_bp.route('/cancel/<task_id>', methods=['POST'])
+def cancel_task(task_id):
+    """Cancel a queued task, or stop a running one at its next smallcode/assignment"""
+    state = task_executor.cancel(task_id)
+    if state is None:
+        if is_task_active(task_id):
+            return jsonify({'success': False, 'message': 'Task is running in another server process'}), 409
+        return jsonify({'success': False, 'message': 'Task is not queued or running'}), 404
+    
+    if state == 'queued':
+        task_progress[task_id]['status'] = 'cancelled'
+        task_progress[task_id]['message'] = 'Cancelled before start'
+    else:
+        task_progress[task_id]['message'] = 'Cancelling...'
+    
+    return jsonify({'success': True, 'state': state})
+
+
+@action_bp.route('/queue', methods=['GET'])
+def get_queue():
+    """Task executor load: worker count, running task ids, queued count"""
+    return jsonify({'success': True, 'data': task_executor.stats()})
+
+
+def _parse_cursor(value) -> int:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
 @action_bp.route('/progress/<task_id>', methods=['GET'])
 def get_progress(task_id):
-    """Get task progress"""
-    if task_id not in task_progress:
+    """
+    Get task progress (latest log lines only, see /task-log for the full log)
+    Query: ?since=<log_cursor> to get only log lines added after that cursor
+    """
+    data = task_progress.snapshot(task_id, _parse_cursor(request.args.get('since')))
+    if data is None:
         return jsonify({'success': False, 'message': 'Task not found'}), 404
     
     return jsonify({
         'success': True,
-        'data': task_progress[task_id]
+        'data': data
     })
 
 
+@action_bp.route('/progress/<task_id>/stream', methods=['GET'])
+def stream_progress(task_id):
+    """
+    Server-Sent Events stream of task progress. Each 'progress' event carries
+    only what changed: fields with a new value and log lines after the cursor.
+    The event id is the log cursor; reconnects resume from Last-Event-ID or ?since.
+    The stream ends after the event that reports a finished status.
+    """
+    cursor = _parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('since')) or 0
+    if task_progress.snapshot(task_id, cursor) is None:
+        return jsonify({'success': False, 'message': 'Task not found'}), 404
+    
+    def events():
+        nonlocal cursor
+        sent = {}
+        finishing = False
+        last_event = time.time()
+        while True:
+            # Works for tasks of this process and, through the task state backend, of others
+            data = task_progress.snapshot(task_id, cursor)
+            if data is None:
+                yield 'event: end\ndata: {}\n\n'
+                return
+            lines = data.pop('logs')
+            next_cursor = data.pop('log_cursor')
+            gap = data.pop('log_gap', False)
+            data.pop('log_total', None)
+            changed = {k: v for k, v in data.items() if sent.get(k) != v}
+            
+            if changed or lines or gap:
+                delta = {'fields': changed, 'logs': lines, 'log_cursor': next_cursor}
+                if gap:
+                    delta['log_gap'] = True
+                yield f"id: {next_cursor}\nevent: progress\ndata: {json.dumps(delta, ensure_ascii=False, default=str)}\n\n"
+                sent.update(changed)
+                cursor = next_cursor
+                last_event = time.time()
+            elif time.time() - last_event >= Config.PROGRESS_STREAM_HEARTBEAT:
+                yield ': keep-alive\n\n'
+                last_event = time.time()
+            
+            if finishing:
+                yield 'event: end\ndata: {}\n\n'
+                return
+            # One more round after the finished status, for log lines written right after it
+            finishing = data.get('status') in FINISHED_STATUSES
+            time.sleep(Config.PROGRESS_STREAM_INTERVAL)
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@action_bp.route('/task-log/<task_id>', methods=['GET'])
+def get_task_log(task_id):
+    """Download the full log of a task"""
+    filepath = task_progress.log_path(os.path.basename(task_id))
+    if not os.path.exists(filepath):
+        return jsonify({'success': False, 'message': 'Log not found'}), 404
+    
+    return send_file(filepath, as_attachment=True, download_name=f'task_{task_id}.log', mimetype='text/plain')
+
+
 @action_bp.route('/download-file/<filename>', methods=['GET'])
 def download_file(filename):
     """Download generated file"""
@@ -533,8 +1166,8 @@ def download_file(filename):
         return jsonify({'success': False, 'message': 'File not found'}), 404
     
     # Determine mimetype based on file extension
-    if filename.endswith('.xlsx'):
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    if get_format(filename):
+        mimetype = OUTPUT_FORMATS[get_format(filename)]
     elif filename.endswith('.xls'):
         mimetype = 'application/vnd.ms-excel'
     else:
@@ -559,7 +1192,7 @@ def get_columns():
     
     if os.path.exists(output_dir):
         for f in os.listdir(output_dir):
-            if f.startswith('Raw_Data') and f.endswith('.xlsx'):
+            if f.startswith('Raw_Data') and get_format(f):
                 if survey_name and survey_name in f:
                     matching_files.append(f)
                 elif not survey_name:
@@ -581,8 +1214,7 @@ def get_columns():
     filepath = os.path.join(output_dir, latest_file)
     
     try:
-        df = pd.read_excel(filepath, nrows=0)  # Only read headers
-        columns = smart_sort_columns(list(df.columns))
+        columns = smart_sort_columns(read_columns(filepath))  # Only read headers
         
         return jsonify({
             'success': True,
@@ -608,8 +1240,7 @@ def get_file_columns(filename):
         return jsonify({'success': False, 'message': 'File not found'}), 404
     
     try:
-        df = pd.read_excel(filepath, nrows=0)  # Only read headers
-        columns = smart_sort_columns(list(df.columns))
+        columns = smart_sort_columns(read_columns(filepath))  # Only read headers
         
         return jsonify({
             'success': True,
@@ -628,6 +1259,10 @@ def export_filtered(filename):
     """Export existing file with only selected columns (no re-scraping)"""
     data = request.get_json()
     selected_columns = data.get('selectedColumns', [])
+    output_format = str(data.get('format') or get_format(filename) or 'xlsx').lower()
+    
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'success': False, 'message': f'format must be one of: {", ".join(OUTPUT_FORMATS)}'}), 400
     
     if not selected_columns:
         return jsonify({'success': False, 'message': 'No columns selected'}), 400
@@ -641,25 +1276,24 @@ def export_filtered(filename):
         return jsonify({'success': False, 'message': 'File not found'}), 404
     
     try:
-        # Read original file
-        df = pd.read_excel(filepath)
-        
         # Filter to only selected columns that exist
-        existing_cols = [c for c in selected_columns if c in df.columns]
+        file_columns = read_columns(filepath)
+        existing_cols = [c for c in selected_columns if c in file_columns]
         
         if not existing_cols:
             return jsonify({'success': False, 'message': 'No valid columns found'}), 400
         
-        df_filtered = df[existing_cols]
+        # Read only the selected columns from original file
+        df_filtered = read_table(filepath, existing_cols)[existing_cols]
         
         # Generate new filename with _filtered suffix
         base_name = os.path.splitext(filename)[0]
         timestamp = datetime.now().strftime("%H%M%S")
-        new_filename = f"{base_name}_filtered_{timestamp}.xlsx"
+        new_filename = f"{base_name}_filtered_{timestamp}.{output_format}"
         new_filepath = os.path.join(Config.RAW_DATA_DIR, new_filename)
         
         # Save filtered file
-        df_filtered.to_excel(new_filepath, index=False)
+        write_dataframe(df_filtered, new_filepath)
         
         return jsonify({
             'success': True,
@@ -682,7 +1316,7 @@ def get_history():
     # Check RAW_DATA_DIR
     if os.path.exists(Config.RAW_DATA_DIR):
         for f in os.listdir(Config.RAW_DATA_DIR):
-            if f.endswith('.xlsx'):
+            if get_format(f):
                 path = os.path.join(Config.RAW_DATA_DIR, f)
                 stats = os.stat(path)
                 history.append({
@@ -695,7 +1329,7 @@ def get_history():
     # Check LOG_DIR
     if os.path.exists(Config.LOG_DIR):
         for f in os.listdir(Config.LOG_DIR):
-            if f.endswith('.xlsx'):
+            if get_format(f):
                 path = os.path.join(Config.LOG_DIR, f)
                 stats = os.stat(path)
                 history.append({
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from selenium_manager import selenium_manager
+from selenium_manager import selenium_manager, wait_timings
+from browser_pool import browser_pool
 from session_manager import session_manager
 
 auth_bp = Blueprint('auth', __name__)
@@ -134,9 +135,22 @@ def status():
     })
 
 
+@auth_bp.route('/wait-timings', methods=['GET'])
+def get_wait_timings():
+    """
+    Browser wait durations per step (seconds)
+    Query: ?reset=1 to clear stats after reading
+    """
+    timings = wait_timings.snapshot()
+    if request.args.get('reset') in ('1', 'true'):
+        wait_timings.reset()
+    return jsonify({'success': True, 'timings': timings})
+
+
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
     """Logout and close browser"""
+    browser_pool.shutdown()
     selenium_manager.close_driver()
     session_manager.clear()
     return jsonify({'success': True, 'message': 'Logged out'})
@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify
-from api_client import api_client
+from region_store import region_store
 
 region_bp = Blueprint('region', __name__)
 
 
+def _refresh_requested() -> bool:
+    """Check ?refresh=1 to bypass the region store and refetch from FASIH-SM"""
+    return request.args.get('refresh', '').lower() in ('1', 'true')
+
+
 @region_bp.route('/metadata/<group_id>', methods=['GET'])
 def get_metadata(group_id):
     """Get region metadata including levels"""
     try:
-        data = api_client.get_region_metadata(group_id)
+        data = region_store.get_metadata(group_id, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': data.get('data', {})
@@ -25,7 +30,7 @@ def get_provinsi():
         return jsonify({'success': False, 'message': 'groupId required'}), 400
     
     try:
-        data = api_client.get_provinsi(group_id)
+        data = region_store.get_provinsi(group_id, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': [{
@@ -49,7 +54,7 @@ def get_kabupaten():
         return jsonify({'success': False, 'message': 'groupId and provFullCode required'}), 400
     
     try:
-        data = api_client.get_kabupaten(group_id, prov_fullcode)
+        data = region_store.get_kabupaten(group_id, prov_fullcode, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': [{
@@ -73,7 +78,7 @@ def get_kecamatan():
         return jsonify({'success': False, 'message': 'groupId and kabId required'}), 400
     
     try:
-        data = api_client.get_kecamatan(group_id, kab_id)
+        data = region_store.get_kecamatan(group_id, kab_id, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': [{
@@ -97,7 +102,7 @@ def get_desa():
         return jsonify({'success': False, 'message': 'groupId and kecId required'}), 400
     
     try:
-        data = api_client.get_desa(group_id, kec_id)
+        data = region_store.get_desa(group_id, kec_id, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': [{
@@ -121,7 +126,7 @@ def get_sls():
         return jsonify({'success': False, 'message': 'groupId and desaId required'}), 400
     
     try:
-        data = api_client.get_sls(group_id, desa_id)
+        data = region_store.get_sls(group_id, desa_id, refresh=_refresh_requested())
         return jsonify({
             'success': True,
             'data': [{
@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify
+from scheduler import job_scheduler, validate_job
+from routes.action import launch_scheduled_job
+
+schedule_bp = Blueprint('schedule', __name__)
+
+
+@schedule_bp.route('/', methods=['GET'])
+def list_jobs():
+    """List saved scheduled jobs"""
+    return jsonify({'success': True, 'data': job_scheduler.list_jobs()})
+
+
+@schedule_bp.route('/', methods=['POST'])
+def create_job():
+    """
+    Save a job: action (download-raw / approve / revoke / reject), the same
+    survey/period/kabupaten fields as the action routes, time (HH:MM) and
+    optional days (weekdays 0-6, empty = every day)
+    """
+    data = request.get_json() or {}
+    error = validate_job(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    return jsonify({'success': True, 'data': job_scheduler.save_job(data)})
+
+
+@schedule_bp.route('/<job_id>', methods=['POST'])
+def update_job(job_id):
+    """Replace a saved job definition"""
+    if not job_scheduler.get_job(job_id):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+    data = request.get_json() or {}
+    error = validate_job(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    return jsonify({'success': True, 'data': job_scheduler.save_job(data, job_id)})
+
+
+@schedule_bp.route('/<job_id>/delete', methods=['POST'])
+def delete_job(job_id):
+    """Delete a saved job (a task it already started keeps running)"""
+    if not job_scheduler.delete_job(job_id):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True})
+
+
+@schedule_bp.route('/<job_id>/run', methods=['POST'])
+def run_job(job_id):
+    """Start a saved job now, outside its schedule"""
+    task_id = job_scheduler.run_now(job_id, launch_scheduled_job)
+    if not task_id:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'taskId': task_id})
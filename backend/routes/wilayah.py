@@ -1,17 +1,50 @@
 import os
 import json
 from flask import Blueprint, request, jsonify
-from api_client import api_client
+from region_store import region_store
+from region_tree import walk_region_tree
 from config import Config
 
 wilayah_bp = Blueprint('wilayah', __name__)
 
 
-def get_wilayah_filepath(survey_id: str, period_id: str, kab_id: str) -> str:
-    """Generate filepath for wilayah cache file"""
-    filename = f"wilayah_{survey_id}_{period_id}_{kab_id}.json"
-    os.makedirs(Config.WILAYAH_DIR, exist_ok=True)
-    return os.path.join(Config.WILAYAH_DIR, filename)
+def find_legacy_wilayah_file(kab_id: str, group_id: str = None, survey_id: str = None, period_id: str = None) -> str:
+    """Find a wilayah JSON cache file written by older versions, or None"""
+    candidates = []
+    if group_id:
+        candidates.append(os.path.join(Config.WILAYAH_DIR, f"wilayah_{group_id}_{kab_id}.json"))
+    if survey_id and period_id:
+        candidates.append(os.path.join(Config.WILAYAH_DIR, f"wilayah_{survey_id}_{period_id}_{kab_id}.json"))
+    
+    for filepath in candidates:
+        if os.path.exists(filepath):
+            return filepath
+    return None
+
+
+def get_wilayah_info(kab_id: str, group_id: str = None, survey_id: str = None, period_id: str = None) -> dict:
+    """
+    Get wilayah cache header from region store, or None if not cached.
+    A legacy JSON cache file is imported into the store the first time it is seen.
+    """
+    if group_id:
+        info = region_store.get_wilayah_info(group_id, kab_id)
+        if info:
+            return info
+    
+    filepath = find_legacy_wilayah_file(kab_id, group_id, survey_id, period_id)
+    if not filepath:
+        return None
+    
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    legacy_group_id = data.get('groupId') or group_id or ''
+    region_store.save_wilayah(
+        legacy_group_id, kab_id, data.get('smallcodes', []),
+        survey_id=data.get('surveyId'), period_id=data.get('periodId')
+    )
+    return region_store.get_wilayah_info(legacy_group_id, kab_id)
 
 
 def get_all_smallcodes_with_details(group_id: str, kab_id: str) -> list:
@@ -19,76 +52,39 @@ def get_all_smallcodes_with_details(group_id: str, kab_id: str) -> list:
     result = []
     
     # Get region metadata for levels
-    metadata = api_client.get_region_metadata(group_id)
+    metadata = region_store.get_metadata(group_id)
     level_region = metadata.get('data', {}).get('level', [])
     
-    kecamatan_list = api_client.get_kecamatan(group_id, kab_id)
-    
-    for kec in kecamatan_list:
-        if len(level_region) == 3:
-            result.append({
-                'smallcode': kec['fullCode'],
-                'kecamatan': kec['name'],
-                'desa': None,
-                'sls': None
-            })
-            continue
-            
-        desa_list = api_client.get_desa(group_id, kec['id'])
-        
-        for desa in desa_list:
-            if len(level_region) == 4:
-                result.append({
-                    'smallcode': desa['fullCode'],
-                    'kecamatan': kec['name'],
-                    'desa': desa['name'],
-                    'sls': None
-                })
-                continue
-                
-            sls_list = api_client.get_sls(group_id, desa['id'])
-            
-            for sls in sls_list:
-                if len(level_region) == 5:
-                    result.append({
-                        'smallcode': sls['fullCode'],
-                        'kecamatan': kec['name'],
-                        'desa': desa['name'],
-                        'sls': sls['name']
-                    })
-                    continue
-                    
-                subsls_list = api_client.get_subsls(group_id, sls['id'])
-                for subsls in subsls_list:
-                    result.append({
-                        'smallcode': subsls['fullCode'],
-                        'kecamatan': kec['name'],
-                        'desa': desa['name'],
-                        'sls': f"{sls['name']} / {subsls['name']}"
-                    })
+    for path in walk_region_tree(group_id, kab_id, len(level_region)):
+        kec, desa, sls, subsls = (path + [None] * 4)[:4]
+        result.append({
+            'smallcode': path[-1]['fullCode'],
+            'kecamatan': kec['name'],
+            'desa': desa['name'] if desa else None,
+            'sls': f"{sls['name']} / {subsls['name']}" if subsls else (sls['name'] if sls else None)
+        })
     
     return result
 
 
 @wilayah_bp.route('/status', methods=['GET'])
 def check_status():
-    """Check if wilayah cache file exists"""
+    """Check if wilayah cache exists (reads only the cache header)"""
     survey_id = request.args.get('surveyId')
     period_id = request.args.get('periodId')
     kab_id = request.args.get('kabId')
+    group_id = request.args.get('groupId')
     
-    if not all([survey_id, period_id, kab_id]):
+    if not kab_id or not (group_id or (survey_id and period_id)):
         return jsonify({'success': False, 'message': 'Missing parameters'}), 400
     
-    filepath = get_wilayah_filepath(survey_id, period_id, kab_id)
+    info = get_wilayah_info(kab_id, group_id, survey_id, period_id)
     
-    if os.path.exists(filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    if info:
         return jsonify({
             'success': True,
             'exists': True,
-            'count': len(data.get('smallcodes', []))
+            'count': info['count']
         })
     
     return jsonify({
@@ -100,38 +96,35 @@ def check_status():
 
 @wilayah_bp.route('/fetch', methods=['POST'])
 def fetch_wilayah():
-    """Fetch wilayah from FASIH-SM API and save to cache"""
+    """
+    Fetch wilayah from FASIH-SM API and save to cache.
+    Body: { surveyId, periodId, kabId, groupId, refresh?: bool }
+    Without refresh, nodes already in the region store are not refetched;
+    with refresh, only this kabupaten's subtree is dropped and recrawled.
+    """
     data = request.get_json()
     
     survey_id = data.get('surveyId')
     period_id = data.get('periodId')
     kab_id = data.get('kabId')
     group_id = data.get('groupId')
+    refresh = bool(data.get('refresh', False))
     
     if not all([survey_id, period_id, kab_id, group_id]):
         return jsonify({'success': False, 'message': 'Missing parameters'}), 400
     
     try:
-        # Fetch all smallcodes
-        smallcodes = get_all_smallcodes_with_details(group_id, kab_id)
+        if refresh:
+            region_store.invalidate_subtree(group_id, 3, kab_id)
         
-        # Save to file
-        filepath = get_wilayah_filepath(survey_id, period_id, kab_id)
-        cache_data = {
-            'surveyId': survey_id,
-            'periodId': period_id,
-            'kabId': kab_id,
-            'groupId': group_id,
-            'smallcodes': smallcodes
-        }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        # Fetch all smallcodes and save to region store
+        smallcodes = get_all_smallcodes_with_details(group_id, kab_id)
+        count = region_store.save_wilayah(group_id, kab_id, smallcodes, survey_id=survey_id, period_id=period_id)
         
         return jsonify({
             'success': True,
-            'count': len(smallcodes),
-            'message': f'Fetched and cached {len(smallcodes)} smallcodes'
+            'count': count,
+            'message': f'Fetched and cached {count} smallcodes'
         })
         
     except Exception as e:
@@ -143,23 +136,31 @@ def fetch_wilayah():
 
 @wilayah_bp.route('/data', methods=['GET'])
 def get_wilayah_data():
-    """Get cached wilayah data"""
+    """
+    Get cached wilayah data.
+    Optional ?kecamatan=<name> returns only that kecamatan's smallcodes.
+    """
     survey_id = request.args.get('surveyId')
     period_id = request.args.get('periodId')
     kab_id = request.args.get('kabId')
+    group_id = request.args.get('groupId')
+    kecamatan = request.args.get('kecamatan')
     
-    if not all([survey_id, period_id, kab_id]):
+    if not kab_id or not (group_id or (survey_id and period_id)):
         return jsonify({'success': False, 'message': 'Missing parameters'}), 400
     
-    filepath = get_wilayah_filepath(survey_id, period_id, kab_id)
+    info = get_wilayah_info(kab_id, group_id, survey_id, period_id)
     
-    if not os.path.exists(filepath):
+    if not info:
         return jsonify({'success': False, 'message': 'Cache not found'}), 404
     
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
     return jsonify({
         'success': True,
-        'data': data
+        'data': {
+            'surveyId': info['surveyId'],
+            'periodId': info['periodId'],
+            'kabId': kab_id,
+            'groupId': info['groupId'],
+            'smallcodes': region_store.load_wilayah(info['groupId'], kab_id, kecamatan)
+        }
     })
@@ -0,0 +1,235 @@
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from exporter import OUTPUT_FORMATS
+from config import Config
+from sqlite_store import SQLiteStore
+
+
+JOB_ACTIONS = ('download-raw', 'approve', 'revoke', 'reject')
+JOB_REQUIRED = ['surveyId', 'periodId', 'templateId', 'groupId', 'kabId', 'kabName', 'surveyName', 'periodName']
+
+
+def validate_job(data: dict) -> str:
+    """Error message for an invalid job definition, or None"""
+    for field in JOB_REQUIRED + ['action', 'time']:
+        if not data.get(field):
+            return f'{field} required'
+
+    if data['action'] not in JOB_ACTIONS:
+        return f'action must be one of: {", ".join(JOB_ACTIONS)}'
+
+    if str(data.get('format', 'xlsx')).lower() not in OUTPUT_FORMATS:
+        return f'format must be one of: {", ".join(OUTPUT_FORMATS)}'
+
+    if data.get('executor') and data['executor'] not in ('auto', 'http', 'selenium'):
+        return 'executor must be one of: auto, http, selenium'
+
+    try:
+        datetime.strptime(data['time'], '%H:%M')
+    except (TypeError, ValueError):
+        return 'time must be HH:MM'
+
+    days = data.get('days') or []
+    # bool is an int subclass: True/False would pass as Tuesday/Monday
+    if not isinstance(days, list) or any(
+        not isinstance(day, int) or isinstance(day, bool) or day not in range(7) for day in days
+    ):
+        return 'days must be a list of weekdays 0 (Monday) - 6 (Sunday)'
+
+    return None
+
+
+class JobScheduler(SQLiteStore):
+    """
+    Runs saved job definitions (download-raw / approve / revoke / reject with
+    survey, period, kabupaten, columns, format) once a day at their configured
+    time. A due job is claimed in SQLite before it starts, so only one process
+    runs it; at most SCHEDULER_MAX_CONCURRENT scheduled jobs are active at once,
+    the others wait until a slot frees up within the catch-up window.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS schedule_job (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            action TEXT NOT NULL,
+            params TEXT NOT NULL,
+            run_at TEXT NOT NULL,
+            days TEXT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            last_run_date TEXT,
+            last_task_id TEXT,
+            created_at TEXT NOT NULL
+        )
+    """
+
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path or Config.SCHEDULE_STORE_PATH)
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> dict:
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'action': row['action'],
+            'params': json.loads(row['params']),
+            'time': row['run_at'],
+            'days': json.loads(row['days']),
+            'enabled': bool(row['enabled']),
+            'lastRunDate': row['last_run_date'],
+            'lastTaskId': row['last_task_id'],
+            'createdAt': row['created_at']
+        }
+
+    def list_jobs(self) -> list:
+        conn = self._connect()
+        rows = conn.execute('SELECT * FROM schedule_job ORDER BY run_at, created_at').fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def get_job(self, job_id: str) -> dict:
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM schedule_job WHERE id = ?', (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def save_job(self, data: dict, job_id: str = None) -> dict:
+        """Create (job_id None) or replace a job definition. data is validated by validate_job"""
+        params = {key: data[key] for key in JOB_REQUIRED}
+        params.update({
+            'format': str(data.get('format', 'xlsx')).lower(),
+            'selectedColumns': data.get('selectedColumns', []),
+            'incremental': bool(data.get('incremental', False)),
+            'executor': data.get('executor')
+        })
+        job_id = job_id or uuid.uuid4().hex[:12]
+
+        with self._write_lock, self._connect() as conn:
+            # Editing a job keeps its run history
+            existing = conn.execute(
+                'SELECT last_run_date, last_task_id, created_at FROM schedule_job WHERE id = ?', (job_id,)
+            ).fetchone()
+            conn.execute(
+                'INSERT OR REPLACE INTO schedule_job '
+                '(id, name, action, params, run_at, days, enabled, last_run_date, last_task_id, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, data.get('name') or f"{data['action']} {data['kabName']}", data['action'],
+                 json.dumps(params, ensure_ascii=False), data['time'], json.dumps(data.get('days') or []),
+                 int(data.get('enabled', True)),
+                 existing['last_run_date'] if existing else None,
+                 existing['last_task_id'] if existing else None,
+                 existing['created_at'] if existing else datetime.now().isoformat())
+            )
+        return self.get_job(job_id)
+
+    def delete_job(self, job_id: str) -> bool:
+        with self._write_lock, self._connect() as conn:
+            return conn.execute('DELETE FROM schedule_job WHERE id = ?', (job_id,)).rowcount > 0
+
+    def _claim(self, job_id: str, run_date: str) -> bool:
+        """Mark today's run as taken; False if another process (or an earlier tick) already did"""
+        with self._write_lock, self._connect() as conn:
+            return conn.execute(
+                'UPDATE schedule_job SET last_run_date = ? '
+                'WHERE id = ? AND (last_run_date IS NULL OR last_run_date < ?)',
+                (run_date, job_id, run_date)
+            ).rowcount > 0
+
+    def _release(self, job_id: str, run_date: str, previous: str):
+        """Undo a claim whose launch failed, so a later tick can try again"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                'UPDATE schedule_job SET last_run_date = ? WHERE id = ? AND last_run_date = ?',
+                (previous, job_id, run_date)
+            )
+
+    def _record_task(self, job_id: str, task_id: str):
+        with self._write_lock, self._connect() as conn:
+            conn.execute('UPDATE schedule_job SET last_task_id = ? WHERE id = ?', (task_id, job_id))
+
+    @staticmethod
+    def due_date(job: dict, now: datetime) -> str:
+        """
+        Date (ISO) of the run that is due now, or None. A run is due inside
+        [time, time + catch-up window] on a scheduled day it has not run for;
+        yesterday's window counts too, since it may reach past midnight.
+        """
+        if not job['enabled']:
+            return None
+        hour, minute = map(int, job['time'].split(':'))
+        today = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        for start in (today - timedelta(days=1), today):
+            if job['days'] and start.weekday() not in job['days']:
+                continue
+            run_date = start.date().isoformat()
+            if job['lastRunDate'] and job['lastRunDate'] >= run_date:
+                continue
+            if start <= now <= start + timedelta(hours=Config.SCHEDULER_CATCHUP_HOURS):
+                return run_date
+        return None
+
+    @classmethod
+    def is_due(cls, job: dict, now: datetime) -> bool:
+        return cls.due_date(job, now) is not None
+
+    def run_due(self, launcher, is_active, now: datetime = None) -> list:
+        """Start due jobs up to the concurrency limit. Returns started task ids"""
+        now = now or datetime.now()
+        jobs = self.list_jobs()
+        running = sum(1 for job in jobs if job['lastTaskId'] and is_active(job['lastTaskId']))
+
+        started = []
+        for job in jobs:
+            if running >= Config.SCHEDULER_MAX_CONCURRENT:
+                break
+            run_date = self.due_date(job, now)
+            if run_date is None or not self._claim(job['id'], run_date):
+                continue
+            try:
+                task_id = launcher(job)
+            except Exception as e:
+                self._release(job['id'], run_date, job['lastRunDate'])
+                print(f"⚠️ Scheduled job {job['name']} failed to start: {e}")
+                continue
+            self._record_task(job['id'], task_id)
+            print(f"⏰ Scheduled job started: {job['name']} ({task_id})")
+            started.append(task_id)
+            running += 1
+        return started
+
+    def run_now(self, job_id: str, launcher) -> str:
+        """Start a job immediately (manual trigger, no time or concurrency check)"""
+        job = self.get_job(job_id)
+        if not job:
+            return None
+        task_id = launcher(job)
+        self._record_task(job_id, task_id)
+        return task_id
+
+    def start(self, launcher, is_active):
+        """Check for due jobs every SCHEDULER_POLL_INTERVAL seconds on a background thread"""
+        if self._thread:
+            return
+
+        def loop():
+            while not self._stop.wait(Config.SCHEDULER_POLL_INTERVAL):
+                try:
+                    self.run_due(launcher, is_active)
+                except Exception as e:
+                    print(f"⚠️ Scheduler error: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, daemon=True, name='job-scheduler')
+        self._thread.start()
+        print("⏰ Job scheduler started")
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+
+# Global instance
+job_scheduler = JobScheduler()
@@ -1,4 +1,6 @@
+import os
 import time
+import threading
 import urllib.parse
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -6,16 +8,98 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException, SessionNotCreatedException
 from requests.cookies import RequestsCookieJar
 from config import Config
+from driver_cache import driver_cache
+
+
+class WaitTimings:
+    """Thread-safe duration stats per wait step, shared by all browser instances"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}
+    
+    def record(self, step: str, seconds: float, timed_out: bool = False):
+        with self._lock:
+            stat = self._steps.setdefault(step, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0, 'timeouts': 0})
+            stat['count'] += 1
+            stat['total'] += seconds
+            stat['max'] = max(stat['max'], seconds)
+            stat['last'] = seconds
+            if timed_out:
+                stat['timeouts'] += 1
+    
+    def snapshot(self) -> dict:
+        """Stats per step (seconds), slowest total first"""
+        with self._lock:
+            steps = {
+                step: {**stat, 'avg': stat['total'] / stat['count']}
+                for step, stat in self._steps.items()
+            }
+        return dict(sorted(steps.items(), key=lambda item: item[1]['total'], reverse=True))
+    
+    def reset(self):
+        with self._lock:
+            self._steps = {}
+
+
+# Global wait telemetry
+wait_timings = WaitTimings()
+
+
+def page_loaded(driver) -> bool:
+    """Condition: document finished loading"""
+    return driver.execute_script('return document.readyState') == 'complete'
+
+
+def on_login_page(driver) -> bool:
+    """Condition: browser was sent to SSO / login page"""
+    url = driver.current_url
+    return 'sso.bps.go.id' in url or 'login' in url.lower()
+
+
+class url_settled:
+    """
+    Condition: page loaded and the URL has stayed under prefix for `seconds`.
+    The FASIH SPA redirects an unauthenticated visitor to SSO client-side,
+    after the document has already finished loading.
+    """
+    
+    def __init__(self, prefix: str, seconds: float):
+        self.prefix = prefix
+        self.seconds = seconds
+        self._url = None
+        self._since = None
+    
+    def __call__(self, driver) -> bool:
+        url = driver.current_url
+        if not url.startswith(self.prefix) or not page_loaded(driver):
+            self._url = None
+            return False
+        if url != self._url:
+            self._url, self._since = url, time.monotonic()
+        return time.monotonic() - self._since >= self.seconds
 
 
 class SeleniumManager:
     """Manages Selenium WebDriver for SSO login and UI interactions"""
     
-    def __init__(self):
+    def __init__(self, headless: bool = False, profile: str = 'main', fast_mode: bool = None):
+        self.fast_mode = Config.BROWSER_FAST_MODE if fast_mode is None else fast_mode
+        self.headless = headless or self.fast_mode
+        # Profile name: separate user-data-dir per concurrent browser in fast mode
+        self.profile = profile
+        # Pre-warmed standby driver: (driver, profile slot), refilled after use when keep-warm is on
+        self._standby = None
+        self._standby_lock = threading.Lock()
+        self._warming = False
+        self._warmed = threading.Event()
+        self._keep_warm = False
+        self._slot = 0
+        # Cleared after the first SPA route that did not re-render, until the next driver
+        self._spa_enabled = True
         self.driver = None
         self.is_logged_in = False
         self.cookies = None
@@ -23,6 +107,21 @@ class SeleniumManager:
         self.username = None
         self.password = None
         
+    def wait_for(self, step: str, condition, timeout: float = 30):
+        """
+        Wait until condition(driver) is truthy and record how long the step took.
+        Returns the condition result, or None on timeout.
+        """
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            timed_out = True
+            return None
+        finally:
+            wait_timings.record(step, time.perf_counter() - start, timed_out)
+    
     def check_browser_alive(self):
         """Check if browser window is still open and responsive"""
         if not self.driver:
@@ -46,19 +145,128 @@ class SeleniumManager:
             except:
                 pass
             self.driver = None
-
-        service = Service(ChromeDriverManager().install())
+        
+        standby = self._take_standby()
+        if not standby and self._warming:
+            # A standby is still starting: wait for it rather than cold-launching a second Chrome
+            self._warmed.wait(60)
+            standby = self._take_standby()
+        if standby:
+            self.driver, self._slot = standby
+            print("♨️ Using pre-warmed browser")
+        else:
+            self.driver = self._launch_driver(self._slot)
+        self._spa_enabled = True
+        
+        if self._keep_warm:
+            self.warm_up()
+        return self.driver
+    
+    def _launch_driver(self, slot: int = 0):
+        """Start a new Chrome. Slot picks the fast mode profile dir (active and standby can't share one)"""
         chrome_options = Options()
         chrome_options.add_argument("--log-level=3")
         chrome_options.add_argument("--disable-logging")
         chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        if self.headless:
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--window-size=1366,900")
+        if self.fast_mode:
+            self._apply_fast_mode(chrome_options, slot)
         
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        return self.driver
+        try:
+            driver = webdriver.Chrome(service=Service(driver_cache.resolve()), options=chrome_options)
+        except SessionNotCreatedException:
+            # Cached driver no longer matches Chrome: resolve again once
+            driver = webdriver.Chrome(service=Service(driver_cache.resolve(force=True)), options=chrome_options)
+        if self.fast_mode and Config.BROWSER_BLOCKED_URLS:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': Config.BROWSER_BLOCKED_URLS})
+            except Exception as e:
+                print(f"⚠️ Could not set blocked URLs: {e}")
+        return driver
+    
+    def _apply_fast_mode(self, chrome_options: Options, slot: int = 0):
+        """Lightweight profile: no images/fonts, eager page load, persistent disk cache"""
+        profile = self.profile if slot == 0 else f"{self.profile}-standby"
+        profile_dir = os.path.join(Config.BROWSER_PROFILE_DIR, profile)
+        os.makedirs(profile_dir, exist_ok=True)
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-remote-fonts")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2
+        })
+        # Return from get() at DOMContentLoaded; callers wait for the element they need
+        chrome_options.page_load_strategy = 'eager'
+    
+    def warm_up(self, keep_warm: bool = True):
+        """
+        Launch a standby Chrome in the background so the next setup_driver
+        (login or crash recovery) skips the cold start. With keep_warm the
+        standby is refilled every time it gets used.
+        """
+        self._keep_warm = self._keep_warm or keep_warm
+        with self._standby_lock:
+            if self._standby or self._warming:
+                return
+            self._warming = True
+            self._warmed.clear()
+        
+        def launch():
+            # Always the other profile slot: the active driver may be (re)launched on its own meanwhile
+            slot = 1 - self._slot
+            driver = None
+            try:
+                driver = self._launch_driver(slot)
+            except Exception as e:
+                print(f"⚠️ Browser warm-up failed: {e}")
+            with self._standby_lock:
+                self._warming = False
+                if driver:
+                    self._standby = (driver, slot)
+                self._warmed.set()
+            if driver:
+                print("♨️ Standby browser ready")
+        
+        threading.Thread(target=launch, daemon=True).start()
+    
+    def _take_standby(self):
+        """Pop the standby driver if it is ready and still alive"""
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+        if not standby:
+            return None
+        try:
+            _ = standby[0].window_handles
+            return standby
+        except:
+            try:
+                standby[0].quit()
+            except:
+                pass
+            return None
+    
+    def close_standby(self):
+        """Quit the parked standby driver (server shutdown)"""
+        self._keep_warm = False
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+        if standby:
+            try:
+                standby[0].quit()
+            except:
+                pass
     
     def minimize_driver(self):
         """Minimize browser window after successful login"""
-        if self.check_browser_alive():
+        if not self.headless and self.check_browser_alive():
             self.driver.minimize_window()
             
     def restore_driver(self):
@@ -87,18 +295,7 @@ class SeleniumManager:
         # Try cookie injection first if we have cookies
         if self.cookies:
             try:
-                # Prepare cookies for injection
-                cookie_list = []
-                for cookie in self.cookies:
-                    cookie_list.append({
-                        'name': cookie.name,
-                        'value': cookie.value,
-                        'domain': cookie.domain,
-                        'path': cookie.path,
-                        'secure': cookie.secure
-                    })
-                
-                res = self.inject_saved_session({'cookies': cookie_list, 'username': self.username, 'password': self.password})
+                res = self.inject_saved_session(self.get_saved_session_data())
                 if res['success']:
                     return True
             except:
@@ -132,7 +329,6 @@ class SeleniumManager:
             sso_domains = [d for d in domain_cookies.keys() if 'sso.bps.go.id' in d]
             if sso_domains:
                 self.driver.get(Config.SSO_URL)
-                time.sleep(1)
                 for dom in sso_domains:
                     for cookie in domain_cookies[dom]:
                         try:
@@ -147,7 +343,6 @@ class SeleniumManager:
 
             # Then visit FASIH
             self.driver.get("https://fasih-sm.bps.go.id")
-            time.sleep(1)
             fasih_domains = [d for d in domain_cookies.keys() if 'fasih' in d or d == '.bps.go.id' or d == 'bps.go.id']
             for dom in fasih_domains:
                 for cookie in domain_cookies[dom]:
@@ -161,15 +356,19 @@ class SeleniumManager:
                         })
                     except: pass
             
-            # Navigate to survey page to validate session
+            # Navigate to survey page to validate session: either we get
+            # redirected to login, or the survey page stays put once loaded
             self.driver.get(Config.FASIH_SURVEY_URL)
-            time.sleep(4)
+            settled = url_settled(Config.FASIH_SURVEY_URL, Config.BROWSER_URL_SETTLE)
+            validated = self.wait_for('inject.validate', lambda d: on_login_page(d) or settled(d), timeout=20)
             
             # Check if we're logged in
-            current_url = self.driver.current_url
-            if 'sso.bps.go.id' in current_url or 'login' in current_url.lower():
+            if on_login_page(self.driver):
                 self.close_driver()
                 return {'success': False, 'message': 'Session expired, redirected to login'}
+            if not validated:
+                self.close_driver()
+                return {'success': False, 'message': 'Session could not be validated (survey page did not settle)'}
             
             self.cookies = self._get_authenticated_cookies()
             self.headers = self._build_headers()
@@ -194,13 +393,23 @@ class SeleniumManager:
             
             self.setup_driver()
             self.driver.get(Config.SSO_URL)
-            time.sleep(2)
+            self.wait_for('login.form', EC.presence_of_element_located((By.NAME, "username")), timeout=20)
             
             # Fill login form
             self.driver.find_element(By.NAME, "username").send_keys(username)
             self.driver.find_element(By.NAME, "password").send_keys(password)
-            self.driver.find_element(By.XPATH, '//*[@id="kc-login"]').click()
-            time.sleep(2)
+            login_button = self.driver.find_element(By.XPATH, '//*[@id="kc-login"]')
+            login_button.click()
+            
+            # Either the OTP form shows up or the login page is left
+            self.wait_for(
+                'login.submit',
+                EC.any_of(
+                    EC.presence_of_element_located((By.XPATH, '//*[@id="otp"]')),
+                    EC.staleness_of(login_button)
+                ),
+                timeout=20
+            )
             
             # Check if OTP is required
             try:
@@ -217,9 +426,10 @@ class SeleniumManager:
         try:
             otp_element = self.driver.find_element(By.XPATH, '//*[@id="otp"]')
             otp_element.clear()
-            time.sleep(0.3)
             otp_element.send_keys(otp)
-            time.sleep(0.5)
+            
+            # Input blocked by a browser popup shows up as the value never matching
+            self.wait_for('otp.input', lambda d: otp_element.get_attribute('value') == otp, timeout=2)
             
             if otp_element.get_attribute('value') != otp:
                 return {
@@ -230,7 +440,9 @@ class SeleniumManager:
                 }
             
             self.driver.find_element(By.XPATH, '//*[@id="kc-login"]').click()
-            time.sleep(2)
+            
+            # Page reloads either way: wait for the old OTP field to go stale
+            self.wait_for('otp.submit', EC.staleness_of(otp_element), timeout=20)
             
             try:
                 self.driver.find_element(By.XPATH, '//*[@id="otp"]')
@@ -258,9 +470,17 @@ class SeleniumManager:
         """Complete login to FASIH-SM after SSO"""
         try:
             self.driver.get(Config.FASIH_OAUTH_URL)
-            time.sleep(5)
+            self.wait_for(
+                'fasih.oauth',
+                lambda d: d.current_url.startswith(Config.FASIH_BASE_URL) and 'oauth2' not in d.current_url and page_loaded(d),
+                timeout=30
+            )
             self.driver.get(Config.FASIH_SURVEY_URL)
-            time.sleep(3)
+            self.wait_for(
+                'fasih.survey_page',
+                lambda d: page_loaded(d) and d.get_cookie('XSRF-TOKEN') is not None,
+                timeout=20
+            )
             
             self.cookies = self._get_authenticated_cookies()
             self.headers = self._build_headers()
@@ -301,6 +521,19 @@ class SeleniumManager:
             'Origin': 'https://fasih-sm.bps.go.id'
         }
         
+    def get_saved_session_data(self) -> dict:
+        """Get session in the saved-session format accepted by inject_saved_session"""
+        cookie_list = []
+        for cookie in self.cookies or []:
+            cookie_list.append({
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'secure': cookie.secure
+            })
+        return {'cookies': cookie_list, 'username': self.username, 'password': self.password}
+    
     def get_session_data(self) -> dict:
         """Get current session data for API requests"""
         return {
@@ -311,6 +544,40 @@ class SeleniumManager:
             'password': self.password
         }
     
+    def _spa_navigate(self, url: str, button_id: str) -> bool:
+        """
+        Route the already loaded FASIH app to url with history.pushState + popstate,
+        so the SPA bundle is not reloaded for every assignment.
+        Returns False when a full page load is needed instead: browser is not on
+        the app, the app root is missing, or the previous view did not go away.
+        """
+        try:
+            if not self.driver.current_url.startswith(Config.FASIH_BASE_URL) or on_login_page(self.driver):
+                return False
+            if not self.driver.find_elements(By.ID, 'fasih'):
+                return False
+            
+            old_buttons = self.driver.find_elements(By.ID, button_id)
+            self.driver.execute_script(
+                "window.history.pushState({}, '', arguments[0]);"
+                "window.dispatchEvent(new PopStateEvent('popstate', { state: {} }));",
+                url[len(Config.FASIH_BASE_URL):]
+            )
+        except Exception:
+            return False
+        
+        # The previous assignment's button must be gone, or we could click it again
+        if old_buttons and self.wait_for('action.spa_render', EC.staleness_of(old_buttons[0]), timeout=Config.BROWSER_SPA_TIMEOUT) is None:
+            self._disable_spa()
+            return False
+        return self.driver.current_url == url
+    
+    def _disable_spa(self):
+        """The app reuses the review view across routes: full page loads from now on for this driver"""
+        if self._spa_enabled:
+            print("⚠️ SPA navigation did not re-render the review page, using full page loads")
+        self._spa_enabled = False
+    
     def navigate_and_click(self, url: str, button_id: str, max_attempts: int = 5) -> dict:
         """
         Navigate to URL and click a button. Recovers if browser window is closed.
@@ -323,12 +590,17 @@ class SeleniumManager:
                 return {'success': False, 'message': 'Browser window closed and recovery failed. Please login again.'}
         
         try:
-            self.driver.get(url)
-            wait = WebDriverWait(self.driver, 30)
-            
-            # Wait for button to be present and clickable
-            wait.until(EC.presence_of_element_located((By.ID, button_id)))
-            button = wait.until(EC.element_to_be_clickable((By.ID, button_id)))
+            spa = Config.BROWSER_SPA_NAVIGATION and self._spa_enabled and self._spa_navigate(url, button_id)
+            if spa:
+                button = self.wait_for('action.button_spa', EC.element_to_be_clickable((By.ID, button_id)), timeout=Config.BROWSER_SPA_TIMEOUT)
+                if button is None:
+                    self._disable_spa()
+            if not spa or button is None:
+                # Not inside the app, or the route did not render the review page: full load
+                self.driver.get(url)
+                button = self.wait_for('action.button', EC.element_to_be_clickable((By.ID, button_id)), timeout=30)
+            if button is None:
+                raise TimeoutException(f'{button_id} not clickable')
             
             # Try to click with retry
             clicked = False
@@ -336,7 +608,6 @@ class SeleniumManager:
             
             while not clicked and attempt < max_attempts:
                 try:
-                    time.sleep(0.5)
                     button.click()
                     clicked = True
                 except (ElementClickInterceptedException, StaleElementReferenceException):
@@ -347,7 +618,9 @@ class SeleniumManager:
                             return {'success': False, 'message': 'Browser closed during click retry.'}
                         self.driver.get(url)
                     
-                    button = wait.until(EC.element_to_be_clickable((By.ID, button_id)))
+                    button = self.wait_for('action.button_retry', EC.element_to_be_clickable((By.ID, button_id)), timeout=30)
+                    if button is None:
+                        raise TimeoutException(f'{button_id} not clickable')
                 except Exception as e:
                     return {'success': False, 'message': str(e)}
             
@@ -357,19 +630,15 @@ class SeleniumManager:
             # Handle confirmation dialogs
             try:
                 confirm_xpath = '//*[@id="fasih"]/div/div/div[6]/button[1]'
-                wait.until(EC.presence_of_element_located((By.XPATH, confirm_xpath)))
-                wait.until(EC.element_to_be_clickable((By.XPATH, confirm_xpath)))
-                confirm1 = self.driver.find_element(By.XPATH, confirm_xpath)
-                confirm1.click()
-                
-                # Second confirmation if exists
-                try:
-                    time.sleep(0.5)
-                    wait.until(EC.element_to_be_clickable((By.XPATH, confirm_xpath)))
-                    confirm2 = self.driver.find_element(By.XPATH, confirm_xpath)
-                    confirm2.click()
-                except TimeoutException:
-                    pass
+                confirm1 = self.wait_for('action.confirm', EC.element_to_be_clickable((By.XPATH, confirm_xpath)), timeout=30)
+                if confirm1 is not None:
+                    confirm1.click()
+                    
+                    # Second confirmation if exists: first dialog goes away, then a new button appears
+                    self.wait_for('action.confirm_close', EC.staleness_of(confirm1), timeout=5)
+                    confirm2 = self.wait_for('action.confirm2', EC.element_to_be_clickable((By.XPATH, confirm_xpath)), timeout=30)
+                    if confirm2 is not None:
+                        confirm2.click()
                     
             except TimeoutException:
                 pass
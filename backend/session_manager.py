@@ -1,9 +1,11 @@
 import os
 import json
+import threading
 import requests
 from datetime import datetime
 from requests.cookies import RequestsCookieJar
 from config import Config
+from http_transport import create_session
 
 
 class SessionManager:
@@ -15,6 +17,8 @@ class SessionManager:
         self.headers = None
         self.username = None
         self.is_logged_in = False
+        self._lock = threading.Lock()
+        self._session_headers = None
         
     def _get_session_filepath(self, username: str) -> str:
         """Get session file path for a username"""
@@ -124,7 +128,7 @@ class SessionManager:
             return False
         
         try:
-            session = requests.Session()
+            session = create_session()
             session.cookies = self.cookies
             session.headers.update(self.headers)
             
@@ -135,7 +139,9 @@ class SessionManager:
             )
             
             if resp.status_code == 200:
-                self.session = session
+                with self._lock:
+                    self.session = session
+                    self._session_headers = self.headers
                 self.is_logged_in = True
                 return True
             return False
@@ -143,17 +149,22 @@ class SessionManager:
             return False
     
     def get_session(self) -> requests.Session:
-        """Get or create requests session with current cookies"""
+        """Get or create pooled requests session with current cookies (thread-safe)"""
         if not self.is_logged_in or not self.cookies:
             return None
+        
+        with self._lock:
+            if self.session is None:
+                self.session = create_session()
             
-        if self.session is None:
-            self.session = requests.Session()
+            # Only touch the shared session when login state changed,
+            # so worker threads don't mutate it on every call
+            if self.session.cookies is not self.cookies or self._session_headers is not self.headers:
+                self.session.cookies = self.cookies
+                self.session.headers.update(self.headers or {})
+                self._session_headers = self.headers
             
-        self.session.cookies = self.cookies
-        self.session.headers.update(self.headers)
-        
-        return self.session
+            return self.session
     
     def get_session_data(self) -> dict:
         """Get current session data"""
@@ -173,7 +184,11 @@ class SessionManager:
     
     def clear(self):
         """Clear session"""
-        self.session = None
+        with self._lock:
+            if self.session is not None:
+                self.session.close()
+            self.session = None
+            self._session_headers = None
         self.cookies = None
         self.headers = None
         self.username = None
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Base of the SQLite-backed stores: a WAL database at db_path whose SCHEMA
+    is created on first use. Each thread keeps one open connection and
+    reuses it across calls. Writes go through
+    `with self._write_lock, self._connect() as conn:` (one transaction each).
+    """
+
+    # executescript() run once per database
+    SCHEMA = ''
+    # PRAGMA synchronous for every connection, None keeps the SQLite default
+    SYNCHRONOUS = None
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Reentrant: the first _connect() can run inside `with self._write_lock`
+        self._write_lock = threading.RLock()
+        self._initialized = None
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection, opened (and the schema created) on first use"""
+        local = self._local
+        if getattr(local, 'path', None) == self.db_path:
+            return local.conn
+
+        if self._initialized != self.db_path:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if self.SYNCHRONOUS:
+            conn.execute(f'PRAGMA synchronous={self.SYNCHRONOUS}')
+        if self._initialized != self.db_path:
+            with self._write_lock:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(self.SCHEMA)
+                self._migrate(conn)
+                conn.commit()
+            self._initialized = self.db_path
+
+        local.conn, local.path = conn, self.db_path
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Schema changes for databases created by older versions (runs after SCHEMA)"""
@@ -0,0 +1,114 @@
+import uuid
+import queue
+import itertools
+import threading
+from datetime import datetime
+from config import Config
+
+
+# Lower runs first: operator-facing actions ahead of kabupaten-wide crawls,
+# scheduled jobs after anything a user is waiting for
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_BACKGROUND = 20
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when it was cancelled"""
+
+
+class TaskExecutor:
+    """
+    Bounded pool of worker threads for background tasks, fed from a priority
+    queue (FIFO within the same priority). Tasks are called as fn(task_id, *args)
+    and cancel cooperatively by checking is_cancelled / check_cancelled.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max(1, max_workers or Config.TASK_WORKERS)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._queued = set()
+        self._running = set()
+        self._cancelled = set()
+
+    @staticmethod
+    def new_task_id() -> str:
+        """Unique, time-sortable task id"""
+        return f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._run, daemon=True, name=f'task-worker-{len(self._workers) + 1}')
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, task_id: str, fn, *args, priority: int = PRIORITY_BATCH) -> str:
+        """Queue fn(task_id, *args). Returns task_id"""
+        with self._lock:
+            self._start_workers()
+            self._cancelled.discard(task_id)
+            self._queued.add(task_id)
+            self._queue.put((priority, next(self._order), task_id, fn, args))
+        return task_id
+
+    def _run(self):
+        while True:
+            _, _, task_id, fn, args = self._queue.get()
+            with self._lock:
+                self._queued.discard(task_id)
+                if task_id in self._cancelled:
+                    # Cancelled while waiting: never started
+                    self._cancelled.discard(task_id)
+                    continue
+                self._running.add(task_id)
+            try:
+                fn(task_id, *args)
+            except Exception as e:
+                # Task functions report their own errors; this only keeps the worker alive
+                print(f"⚠️ Task {task_id} crashed: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(task_id)
+                    self._cancelled.discard(task_id)
+
+    def cancel(self, task_id: str) -> str:
+        """
+        Request cancellation. Returns 'queued' (will not start), 'running'
+        (stops at its next check) or None if the task is unknown or finished.
+        """
+        with self._lock:
+            if task_id in self._queued:
+                self._cancelled.add(task_id)
+                return 'queued'
+            if task_id in self._running:
+                self._cancelled.add(task_id)
+                return 'running'
+        return None
+
+    def is_cancelled(self, task_id: str) -> bool:
+        return task_id in self._cancelled
+
+    def check_cancelled(self, task_id: str):
+        """Raise TaskCancelled if the task was cancelled"""
+        if task_id in self._cancelled:
+            raise TaskCancelled(f'Task {task_id} cancelled')
+
+    def is_active(self, task_id: str) -> bool:
+        """Queued or running"""
+        with self._lock:
+            return task_id in self._queued or task_id in self._running
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'running': sorted(self._running),
+                'queued': len(self._queued - self._cancelled)
+            }
+
+
+# Global instance
+task_executor = TaskExecutor()
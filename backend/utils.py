@@ -1,10 +1,15 @@
 import json
 
-def extract_answers(answers):
-    """Extract and format answers from assignment data"""
+def extract_answers(answers, keys=None):
+    """
+    Extract and format answers from assignment data.
+    If keys (set of dataKeys) is given, only those answers are formatted and kept.
+    """
     result = {}
     for item in answers:
         key = item.get("dataKey")
+        if keys is not None and key not in keys:
+            continue
         ans = item.get("answer")
 
         if isinstance(ans, list):
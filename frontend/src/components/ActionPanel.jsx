@@ -1,10 +1,13 @@
-import React from 'react';
+import React, { useState } from 'react';
 
 const ActionPanel = ({ onAction, disabled, role }) => {
+    const [format, setFormat] = useState('xlsx');
+    const [incremental, setIncremental] = useState(false);
+
     // Directly trigger download without column selection
     // Column selection is now only available in Download History
     const handleDownloadClick = () => {
-        onAction('download-raw', []);
+        onAction('download-raw', [], { format, incremental });
     };
 
     return (
@@ -15,9 +18,32 @@ const ActionPanel = ({ onAction, disabled, role }) => {
                         <i className="bi bi-lightning text-warning"></i>
                         <h6 className="mb-0 fw-semibold">Actions</h6>
                     </div>
-                    {role && (
-                        <span className="badge bg-secondary">Role: {role}</span>
-                    )}
+                    <div className="d-flex align-items-center gap-2">
+                        <div className="form-check form-switch mb-0" title="Only refetch assignments changed since the last download">
+                            <input
+                                id="incrementalSwitch"
+                                type="checkbox"
+                                className="form-check-input"
+                                checked={incremental}
+                                onChange={(e) => setIncremental(e.target.checked)}
+                            />
+                            <label htmlFor="incrementalSwitch" className="form-check-label small text-secondary">Incremental</label>
+                        </div>
+                        <select
+                            value={format}
+                            onChange={(e) => setFormat(e.target.value)}
+                            className="form-select form-select-sm bg-dark text-light border-secondary"
+                            style={{ width: 'auto' }}
+                            title="Output format"
+                        >
+                            <option value="xlsx">Excel (.xlsx)</option>
+                            <option value="csv">CSV (.csv)</option>
+                            <option value="parquet">Parquet (.parquet)</option>
+                        </select>
+                        {role && (
+                            <span className="badge bg-secondary">Role: {role}</span>
+                        )}
+                    </div>
                 </div>
 
                 <div className="row g-2">
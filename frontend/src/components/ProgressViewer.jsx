@@ -1,35 +1,101 @@
 import React, { useEffect, useState, useRef } from 'react';
 import { actionService } from '../services/api';
 
+const FINISHED = ['completed', 'error', 'cancelled'];
+// Log lines kept in the viewer; the full log stays on the server
+const MAX_LOGS = 500;
+
 const ProgressViewer = ({ taskId, onClose }) => {
     const [progress, setProgress] = useState({ status: 'initializing', progress: 0, logs: [], message: 'Starting...' });
-    const [downloadUrl, setDownloadUrl] = useState(null);
+    const [pollKey, setPollKey] = useState(0);
+    const cursorRef = useRef(0);
     const logsEndRef = useRef(null);
 
+    // A new task starts from the first log line
+    useEffect(() => {
+        cursorRef.current = 0;
+    }, [taskId]);
+
     useEffect(() => {
+        if (!taskId) return undefined;
+        let source;
         let interval;
-        if (taskId) {
+
+        // Merge a delta: changed fields + log lines after the cursor
+        const applyDelta = (fields, logs, cursor) => {
+            cursorRef.current = cursor;
+            setProgress(p => ({
+                ...p,
+                ...fields,
+                logs: logs.length ? [...(p.logs || []), ...logs].slice(-MAX_LOGS) : p.logs,
+            }));
+        };
+
+        // Fallback when the stream is not available: poll with the log cursor
+        const poll = () => {
             interval = setInterval(async () => {
                 try {
-                    const res = await actionService.getProgress(taskId);
+                    const res = await actionService.getProgress(taskId, cursorRef.current);
                     if (res.data.success) {
-                        const data = res.data.data;
-                        setProgress(data);
-
-                        if (data.status === 'completed' || data.status === 'error') {
+                        const { logs, log_cursor, ...fields } = res.data.data;
+                        applyDelta(fields, logs, log_cursor);
+                        if (FINISHED.includes(fields.status)) {
                             clearInterval(interval);
-                            if (data.filename) {
-                                setDownloadUrl(actionService.getDownloadUrl(data.filename));
-                            }
                         }
                     }
                 } catch (err) {
                     console.error(err);
                 }
             }, 1000);
+        };
+
+        if (window.EventSource) {
+            source = new EventSource(actionService.getProgressStreamUrl(taskId, cursorRef.current));
+            source.addEventListener('progress', (e) => {
+                const delta = JSON.parse(e.data);
+                applyDelta(delta.fields, delta.logs, delta.log_cursor);
+            });
+            source.addEventListener('end', () => source.close());
+            source.onerror = () => {
+                source.close();
+                poll();
+            };
+        } else {
+            poll();
         }
-        return () => clearInterval(interval);
-    }, [taskId]);
+
+        return () => {
+            if (source) source.close();
+            clearInterval(interval);
+        };
+    }, [taskId, pollKey]);
+
+    const downloadUrl = FINISHED.includes(progress.status) && progress.filename
+        ? actionService.getDownloadUrl(progress.filename)
+        : null;
+
+    const handleResume = async () => {
+        try {
+            const res = await actionService.resume(taskId);
+            if (res.data.success) {
+                setProgress(p => ({ ...p, status: 'running', resumable: false, message: 'Resuming...' }));
+                setPollKey(k => k + 1);
+            }
+        } catch (err) {
+            console.error(err);
+        }
+    };
+
+    const handleCancel = async () => {
+        try {
+            const res = await actionService.cancel(taskId);
+            if (res.data.success) {
+                setProgress(p => ({ ...p, message: 'Cancelling...' }));
+            }
+        } catch (err) {
+            console.error(err);
+        }
+    };
 
     useEffect(() => {
         logsEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -38,13 +104,16 @@ const ProgressViewer = ({ taskId, onClose }) => {
     const getProgressVariant = () => {
         if (progress.status === 'completed') return 'bg-success';
         if (progress.status === 'error') return 'bg-danger';
+        if (progress.status === 'cancelled') return 'bg-warning';
         return 'bg-primary';
     };
 
     const getStatusBadge = () => {
         if (progress.status === 'completed') return <span className="badge bg-success">Completed</span>;
         if (progress.status === 'error') return <span className="badge bg-danger">Error</span>;
+        if (progress.status === 'cancelled') return <span className="badge bg-warning text-dark">Cancelled</span>;
         if (progress.status === 'running') return <span className="badge bg-primary animate-pulse-slow">Running</span>;
+        if (progress.status === 'queued') return <span className="badge bg-secondary">Queued</span>;
         return <span className="badge bg-secondary">Initializing</span>;
     };
 
@@ -126,7 +195,17 @@ const ProgressViewer = ({ taskId, onClose }) => {
                             <i className="bi bi-download"></i> Download Result
                         </a>
                     )}
-                    {(progress.status === 'completed' || progress.status === 'error') && (
+                    {(progress.status === 'running' || progress.status === 'queued') && (
+                        <button onClick={handleCancel} className="btn btn-outline-danger btn-sm d-flex align-items-center gap-2">
+                            <i className="bi bi-stop-circle"></i> Cancel
+                        </button>
+                    )}
+                    {(progress.status === 'error' || progress.status === 'cancelled') && progress.resumable && (
+                        <button onClick={handleResume} className="btn btn-warning btn-sm d-flex align-items-center gap-2">
+                            <i className="bi bi-arrow-repeat"></i> Resume
+                        </button>
+                    )}
+                    {FINISHED.includes(progress.status) && (
                         <button onClick={onClose} className="btn btn-secondary btn-sm">
                             Close
                         </button>
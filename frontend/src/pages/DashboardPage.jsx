@@ -166,7 +166,7 @@ const DashboardPage = () => {
 
         try {
             // Check if wilayah cache exists
-            const statusRes = await wilayahService.checkStatus(surveyId, periodId, kabId);
+            const statusRes = await wilayahService.checkStatus(surveyId, periodId, kabId, groupId);
 
             if (statusRes.data.exists) {
                 setWilayahStatus({ status: 'ready', count: statusRes.data.count });
@@ -192,14 +192,19 @@ const DashboardPage = () => {
     };
 
     // --- Actions ---
-    const handleAction = async (type, selectedColumns = []) => {
+    const handleAction = async (type, selectedColumns = [], options = {}) => {
         if (!surveyId || !periodId || !kabId) return;
 
         const payload = {
             surveyId, periodId, templateId, groupId, kabId,
-            kabName, surveyName, periodName
+            kabName, surveyName, periodName,
+            format: options.format || 'xlsx'
         };
 
+        if (type === 'download-raw' && options.incremental) {
+            payload.incremental = true;
+        }
+
         // Add selected columns for download
         if (type === 'download-raw' && selectedColumns.length > 0) {
             payload.selectedColumns = selectedColumns;
@@ -35,8 +35,8 @@ export const regionService = {
 };
 
 export const wilayahService = {
-  checkStatus: (surveyId, periodId, kabId) =>
-    api.get(`/wilayah/status?surveyId=${surveyId}&periodId=${periodId}&kabId=${kabId}`),
+  checkStatus: (surveyId, periodId, kabId, groupId) =>
+    api.get(`/wilayah/status?surveyId=${surveyId}&periodId=${periodId}&kabId=${kabId}&groupId=${groupId || ''}`),
   fetch: (data) => api.post('/wilayah/fetch', data),
 };
 
@@ -49,7 +49,10 @@ export const actionService = {
   approve: (data) => api.post('/action/approve', data),
   revoke: (data) => api.post('/action/revoke', data),
   reject: (data) => api.post('/action/reject', data),
-  getProgress: (taskId) => api.get(`/action/progress/${taskId}`),
+  getProgress: (taskId, since) => api.get(`/action/progress/${taskId}`, { params: since !== undefined ? { since } : {} }),
+  getProgressStreamUrl: (taskId, since = 0) => `${API_URL}/action/progress/${taskId}/stream?since=${since}`,
+  cancel: (taskId) => api.post(`/action/cancel/${taskId}`),
+  resume: (taskId) => api.post(`/action/resume/${taskId}`),
   getDownloadUrl: (filename) => `${API_URL}/action/download-file/${filename}`,
 };
 